@@ -1,3 +1,14 @@
-__all__ = ["__version__"]
+from alter.client import Client
+from alter.core.downloader import TaskConfig
+from alter.core.models import DownloadProgress, DownloadRequest, DownloadResult
+
+__all__ = [
+    "__version__",
+    "Client",
+    "DownloadProgress",
+    "DownloadRequest",
+    "DownloadResult",
+    "TaskConfig",
+]
 
 __version__ = "0.1.0"
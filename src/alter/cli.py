@@ -1,42 +1,230 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import contextlib
 import itertools
+import sys
 from pathlib import Path
-from typing import Iterable
+from typing import Iterable, Iterator, Optional
 
-from alter.core.downloader import TaskConfig
+from alter.core import profiling
+from alter.core.cache import DEFAULT_CACHE_MAX_BYTES
+from alter.core.downloader import DURABILITY_LEVELS, TaskConfig
 from alter.core.models import DownloadRequest
-from alter.ui.app import DownloadApp
+from alter.core.ranges import ByteRange, parse_byte_range
+from alter.core.rpc import DEFAULT_SOCKET_PATH
 
 
-def _build_requests(urls: list[str], outputs: list[str] | None) -> Iterable[DownloadRequest]:
+DEFAULT_PROFILE_REPORT = Path("alter-profile.txt")
+
+
+def _build_requests(
+    urls: list[str],
+    outputs: list[str] | None,
+    extract_to: Optional[Path] = None,
+    byte_ranges: Optional[list[ByteRange]] = None,
+) -> Iterable[DownloadRequest]:
     outputs_list = outputs or []
     for url, output in itertools.zip_longest(urls, outputs_list, fillvalue=None):
         output_path = Path(output) if output else None
-        yield DownloadRequest(url=url, output=output_path)
+        yield DownloadRequest(
+            url=url,
+            output=output_path,
+            extract_to=extract_to,
+            byte_ranges=tuple(byte_ranges) if byte_ranges else None,
+        )
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="Alter download manager")
-    parser.add_argument("url", nargs="*", help="URL(s) to download")
-    parser.add_argument("-o", "--output", nargs="*", help="Output path(s)")
-    parser.add_argument("--parts", type=int, default=6, help="Number of parts for multipart downloads")
+def _add_config_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--parts", type=int, default=6, help="Number of parts for multipart downloads"
+    )
     parser.add_argument("--chunk-size", type=int, default=1024 * 1024, help="Chunk size in bytes")
     parser.add_argument("--timeout", type=int, default=30, help="Request timeout in seconds")
-    parser.add_argument("--connections", type=int, default=4, help="Max concurrent connections per download")
-    args = parser.parse_args()
+    parser.add_argument(
+        "--connections", type=int, default=4, help="Max concurrent connections per download"
+    )
+    parser.add_argument(
+        "--small-file-threshold",
+        type=int,
+        default=0,
+        help="Stream files up to this many bytes directly, skipping the probe (0 disables)",
+    )
+    parser.add_argument(
+        "--max-active", type=int, default=0, help="Max downloads running at once (0 = unlimited)"
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=4,
+        help="Queued downloads to probe and connect ahead (0 disables)",
+    )
+    parser.add_argument(
+        "--durability",
+        choices=DURABILITY_LEVELS,
+        default="fast",
+        help=(
+            "fast: no fsync; safe: fsync at checkpoints and before the final rename; "
+            "strict: also fsync the directory"
+        ),
+    )
+    parser.add_argument(
+        "--compressed",
+        action="store_true",
+        help="Accept gzip/br/zstd transfer compression on single-stream downloads",
+    )
+    parser.add_argument(
+        "--cache-dir", type=Path, help="Serve repeated downloads from this content cache"
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help="Content cache limit in bytes",
+    )
+
+
+def _add_profile_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        nargs="?",
+        const=DEFAULT_PROFILE_REPORT,
+        metavar="REPORT",
+        help="Time each download stage and sample event-loop lag; write a report at exit",
+    )
+    parser.add_argument(
+        "--profile-trace",
+        type=Path,
+        metavar="TRACE",
+        help=(
+            "Also write a Chrome trace of the profile (opens in Perfetto or speedscope); "
+            "implies --profile"
+        ),
+    )
+
+
+@contextlib.contextmanager
+def _profiling(args: argparse.Namespace) -> Iterator[None]:
+    if args.profile is None and args.profile_trace is None:
+        yield
+        return
+    report = args.profile or DEFAULT_PROFILE_REPORT
+    profiler = profiling.Profiler(trace=args.profile_trace is not None)
+    profiling.enable(profiler)
+    try:
+        yield
+    finally:
+        profiling.disable()
+        report.write_text(profiler.report())
+        if args.profile_trace is not None:
+            profiler.write_trace(args.profile_trace)
+        print(f"alter: profile written to {report}", file=sys.stderr)
+
 
-    requests = list(_build_requests(args.url, args.output))
-    config = TaskConfig(
+def _config_from_args(args: argparse.Namespace) -> TaskConfig:
+    return TaskConfig(
         parts=args.parts,
         chunk_size=args.chunk_size,
         timeout=args.timeout,
         max_connections=args.connections,
+        small_file_threshold=args.small_file_threshold,
+        max_active_tasks=args.max_active,
+        prefetch_depth=args.prefetch,
+        negotiate_encoding=args.compressed,
+        durability=args.durability,
+        cache_dir=args.cache_dir,
+        cache_max_bytes=args.cache_size,
     )
 
-    app = DownloadApp(requests, config=config)
-    app.run()
+
+async def _stream_to_stdout(url: str, config: TaskConfig) -> None:
+    from alter.client import Client
+
+    out = sys.stdout.buffer
+    async with Client(config) as client:
+        async for chunk in client.stream(url):
+            with profiling.span("write", url):
+                await asyncio.to_thread(out.write, chunk)
+    await asyncio.to_thread(out.flush)
+
+
+def _run_daemon(argv: list[str]) -> None:
+    from alter.core.daemon import DownloadDaemon
+
+    parser = argparse.ArgumentParser(
+        prog="alter daemon", description="Run a shared Alter download engine"
+    )
+    parser.add_argument("--socket", type=Path, default=DEFAULT_SOCKET_PATH, help="Unix socket path")
+    _add_config_arguments(parser)
+    _add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+
+    daemon = DownloadDaemon(socket_path=args.socket, config=_config_from_args(args))
+    try:
+        with _profiling(args):
+            asyncio.run(daemon.serve_forever())
+    except RuntimeError as exc:
+        parser.exit(1, f"alter daemon: {exc}\n")
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["daemon"]:
+        _run_daemon(argv[1:])
+        return
+
+    from alter.ui.app import DownloadApp
+
+    parser = argparse.ArgumentParser(description="Alter download manager")
+    parser.add_argument("url", nargs="*", help="URL(s) to download")
+    parser.add_argument("-o", "--output", nargs="*", help="Output path(s)")
+    parser.add_argument(
+        "-x",
+        "--extract-to",
+        type=Path,
+        help="Unpack archives into this directory while downloading",
+    )
+    parser.add_argument(
+        "--range",
+        dest="byte_ranges",
+        type=parse_byte_range,
+        action="append",
+        metavar="SPEC",
+        help='Fetch only this byte range ("0-1023", "4096-", "-65536"); repeatable',
+    )
+    parser.add_argument("--attach", action="store_true", help="Attach to a running `alter daemon`")
+    parser.add_argument(
+        "--socket", type=Path, default=DEFAULT_SOCKET_PATH, help="Daemon socket path"
+    )
+    _add_config_arguments(parser)
+    _add_profile_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.byte_ranges and args.extract_to:
+        parser.error("--range cannot be combined with -x")
+
+    config = _config_from_args(args)
+    if args.output == ["-"]:
+        # Pipe mode: bytes go to stdout in order, so there is no UI
+        if len(args.url) != 1:
+            parser.error("-o - takes exactly one URL")
+        if args.byte_ranges or args.extract_to:
+            parser.error("-o - cannot be combined with --range or -x")
+        try:
+            with _profiling(args):
+                asyncio.run(_stream_to_stdout(args.url[0], config))
+        except BrokenPipeError:
+            pass
+        except Exception as exc:
+            parser.exit(1, f"alter: {exc}\n")
+        return
+
+    requests = list(_build_requests(args.url, args.output, args.extract_to, args.byte_ranges))
+
+    app = DownloadApp(requests, config=config, socket_path=args.socket if args.attach else None)
+    with _profiling(args):
+        app.run()
 
 
 if __name__ == "__main__":
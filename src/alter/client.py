@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import time
+from dataclasses import fields, replace
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, Optional, Union
+
+from alter.core.downloader import DownloadManager, DownloadTask, TaskConfig
+from alter.core.models import DownloadProgress, DownloadRequest, DownloadResult
+from alter.core.ranges import (
+    ByteRangeSpec,
+    coalesce_ranges,
+    discover_size,
+    fetch_ranges,
+    resolve_ranges,
+)
+from alter.core.stream import DEFAULT_BUFFER_BYTES, DEFAULT_SEGMENT_SIZE, stream_url
+
+
+RequestLike = Union[DownloadRequest, str]
+
+DEFAULT_CONCURRENCY = 8
+
+
+def _as_request(request: RequestLike) -> DownloadRequest:
+    return DownloadRequest(url=request) if isinstance(request, str) else request
+
+
+class Client:
+    """
+    Async library entry point for embedding Alter.
+
+        async with alter.Client(parts=4) as client:
+            async for result in client.download_many(urls, concurrency=16):
+                print(result.output, result.ok)
+
+    Keyword arguments override fields of `config` (see TaskConfig).
+    """
+
+    def __init__(
+        self,
+        config: Optional[TaskConfig] = None,
+        *,
+        temp_root: Optional[Path] = None,
+        directory: Optional[Path] = None,
+        progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
+        **overrides: Any,
+    ) -> None:
+        unknown = set(overrides) - {field.name for field in fields(TaskConfig)}
+        if unknown:
+            raise TypeError(f"Unknown TaskConfig option(s): {', '.join(sorted(unknown))}")
+        config = config or TaskConfig()
+        self._config = replace(config, **overrides) if overrides else config
+        self._temp_root = temp_root
+        self._directory = directory
+        self._progress_callback = progress_callback
+        self._manager: Optional[DownloadManager] = None
+        self._futures: set[asyncio.Future[DownloadResult]] = set()
+
+    async def __aenter__(self) -> "Client":
+        self._manager = DownloadManager(
+            temp_root=self._temp_root,
+            config=self._config,
+            progress_callback=self._progress_callback,
+        )
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Stop unfinished downloads and release connections."""
+        if self._manager is None:
+            return
+        for task in self._manager.list():
+            task.stop()
+        if self._futures:
+            await asyncio.gather(*self._futures, return_exceptions=True)
+        await self._manager.close()
+        self._manager = None
+
+    @property
+    def manager(self) -> DownloadManager:
+        if self._manager is None:
+            raise RuntimeError("Client is not open; use 'async with Client(...)'")
+        return self._manager
+
+    def submit(self, request: RequestLike) -> "asyncio.Future[DownloadResult]":
+        """Queue a download and return a future that resolves to its result."""
+        return self._submit(request)[1]
+
+    def _submit(
+        self, request: RequestLike
+    ) -> tuple[DownloadTask, "asyncio.Future[DownloadResult]"]:
+        request = _as_request(request)
+        if self._directory and request.output is None and request.directory is None:
+            request = replace(request, directory=self._directory)
+        manager = self.manager
+        task = manager.add(request)
+        started = time.monotonic()
+        manager.start(task.id)
+        future = asyncio.ensure_future(self._result(task, started))
+        self._futures.add(future)
+        future.add_done_callback(self._futures.discard)
+        return task, future
+
+    async def _result(self, task: DownloadTask, started: float) -> DownloadResult:
+        try:
+            await task.wait()
+        finally:
+            # Finished tasks are only kept for their result
+            self.manager.remove(task.id)
+        return DownloadResult(
+            task_id=task.id,
+            url=task.url,
+            output=task.output,
+            status=task.status,
+            downloaded=task.downloaded,
+            total=task.total,
+            elapsed=time.monotonic() - started,
+            error=task.error,
+        )
+
+    async def download(self, request: RequestLike) -> DownloadResult:
+        return await self.submit(request)
+
+    async def stream(
+        self,
+        request: RequestLike,
+        segment_size: int = DEFAULT_SEGMENT_SIZE,
+        buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+    ) -> AsyncIterator[bytes]:
+        """
+        Yield a resource's bytes in order while fetching it with parallel ranges.
+        At most `buffer_bytes` are held ahead of the consumer; nothing is written to disk.
+        """
+        url = _as_request(request).url
+        async for chunk in stream_url(
+            self.manager.shared_session(), url, self._config, segment_size, buffer_bytes
+        ):
+            yield chunk
+
+    async def fetch_ranges(
+        self, request: RequestLike, ranges: Iterable[ByteRangeSpec]
+    ) -> dict[tuple[int, int], bytes]:
+        """
+        Fetch selected byte ranges of a resource into memory.
+        Returns a map from each requested range, as absolute inclusive (start, end), to its bytes.
+        Nearby ranges share requests, so small gaps are fetched and then discarded.
+        """
+        url = _as_request(request).url
+        session = self.manager.shared_session()
+        requested = resolve_ranges(ranges, await discover_size(session, url))
+        wanted = coalesce_ranges(requested, self._config.range_gap)
+        starts = [start for start, _ in wanted]
+        buffers = [bytearray(end - start + 1) for start, end in wanted]
+
+        def store(offset: int, chunk: bytes) -> None:
+            index = bisect.bisect_right(starts, offset) - 1
+            position = offset - starts[index]
+            buffers[index][position : position + len(chunk)] = chunk
+
+        await fetch_ranges(
+            session, url, wanted, store, self._config.max_connections, self._config.chunk_size
+        )
+        result: dict[tuple[int, int], bytes] = {}
+        for start, end in requested:
+            index = bisect.bisect_right(starts, start) - 1
+            position = start - starts[index]
+            result[(start, end)] = bytes(buffers[index][position : position + end - start + 1])
+        return result
+
+    async def download_many(
+        self,
+        requests: Union[Iterable[RequestLike], AsyncIterable[RequestLike]],
+        concurrency: int = DEFAULT_CONCURRENCY,
+    ) -> AsyncIterator[DownloadResult]:
+        """
+        Download requests with at most `concurrency` in flight, yielding results as they complete.
+        Requests are consumed lazily, so very large (or endless) iterables are fine.
+        """
+        source = _aiter(requests)
+        in_flight: dict[asyncio.Future[DownloadResult], DownloadTask] = {}
+        exhausted = False
+        try:
+            while True:
+                while not exhausted and len(in_flight) < max(1, concurrency):
+                    try:
+                        request = await source.__anext__()
+                    except StopAsyncIteration:
+                        exhausted = True
+                        break
+                    task, future = self._submit(request)
+                    in_flight[future] = task
+                if not in_flight:
+                    return
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    del in_flight[future]
+                    yield future.result()
+        finally:
+            # Consumer stopped early: don't leave orphaned transfers running
+            for future, task in in_flight.items():
+                task.stop()
+                future.cancel()
+
+
+async def _aiter(
+    requests: Union[Iterable[RequestLike], AsyncIterable[RequestLike]]
+) -> AsyncIterator[RequestLike]:
+    if isinstance(requests, AsyncIterable):
+        async for request in requests:
+            yield request
+    else:
+        for request in requests:
+            yield request
@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import stat
+import time
+from pathlib import Path
+from typing import Any, Mapping, Optional
+
+
+DEFAULT_CACHE_MAX_BYTES = 10 * 1024 * 1024 * 1024
+# Index writes are batched; objects themselves are always durable once stored.
+INDEX_FLUSH_INTERVAL = 5.0
+# Linux FICLONE ioctl: share extents copy-on-write on btrfs/xfs/etc.
+_FICLONE = 0x40049409
+
+
+def cache_validator(headers: Mapping[str, str]) -> Optional[str]:
+    """
+    Build a validator identifying one version of a resource.
+    Prefers the ETag; otherwise falls back to Last-Modified plus Content-Length.
+    Returns None when the response is not safely cacheable.
+    """
+    etag = headers.get("ETag")
+    if etag:
+        return f"etag:{etag}"
+    modified = headers.get("Last-Modified")
+    length = headers.get("Content-Length")
+    if modified and length:
+        return f"modified:{modified};length:{length}"
+    return None
+
+
+def file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        while True:
+            chunk = handle.read(1024 * 1024)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clone_or_copy(source: Path, target: Path) -> None:
+    """Copy source to target, sharing extents copy-on-write where the filesystem allows."""
+    target.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        import fcntl
+
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return
+    except (ImportError, OSError):
+        pass
+    shutil.copyfile(source, target)
+
+
+class ContentCache:
+    """
+    Content-addressed download cache.
+    Blobs live under objects/ named by their SHA-256; index.json maps URL+validator keys to
+    digests and records last use for size-bounded LRU eviction. Blobs never share an inode
+    with an output (they are copied or reflinked both ways), and are checked against their
+    digest before being served.
+    """
+
+    def __init__(self, root: Path, max_bytes: int = DEFAULT_CACHE_MAX_BYTES) -> None:
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index_path = root / "index.json"
+        self._keys: dict[str, str] = {}
+        self._objects: dict[str, dict[str, Any]] = {}
+        self._total = 0
+        self._dirty = False
+        self._last_flush = time.monotonic()
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            data = json.loads(self._index_path.read_text())
+        except (OSError, ValueError):
+            return
+        self._keys = dict(data.get("keys", {}))
+        self._objects = dict(data.get("objects", {}))
+        self._total = sum(entry["size"] for entry in self._objects.values())
+
+    def _object_path(self, digest: str) -> Path:
+        return self.root / "objects" / digest[:2] / digest
+
+    @property
+    def size(self) -> int:
+        return self._total
+
+    def lookup(self, url: str, validator: Optional[str]) -> Optional[Path]:
+        if validator is None:
+            return None
+        digest = self._keys.get(f"{url}\n{validator}")
+        return self.lookup_digest(digest) if digest else None
+
+    def lookup_digest(self, digest: str) -> Optional[Path]:
+        digest = digest.lower()
+        entry = self._objects.get(digest)
+        if entry is None:
+            return None
+        path = self._object_path(digest)
+        if not path.exists():
+            self._forget(digest)
+            return None
+        entry["last_used"] = time.time()
+        self._touch()
+        return path
+
+    async def store(
+        self,
+        url: str,
+        validator: Optional[str],
+        path: Path,
+        digest: Optional[str] = None,
+    ) -> str:
+        """Add a finished download to the cache and return its SHA-256."""
+        if digest is None:
+            digest = await asyncio.to_thread(file_digest, path)
+        digest = digest.lower()
+        size = path.stat().st_size
+        if size > self.max_bytes:
+            return digest
+        if digest not in self._objects or not self._object_path(digest).exists():
+            await asyncio.to_thread(self._add_object, path, digest)
+        previous = self._objects.get(digest)
+        self._total += size - (previous["size"] if previous else 0)
+        self._objects[digest] = {"size": size, "last_used": time.time()}
+        if validator is not None:
+            self._keys[f"{url}\n{validator}"] = digest
+        await self._evict()
+        self._touch()
+        return digest
+
+    def _add_object(self, path: Path, digest: str) -> None:
+        target = self._object_path(digest)
+        staging = target.with_name(f".{digest}.tmp")
+        clone_or_copy(path, staging)
+        os.chmod(staging, stat.S_IRUSR | stat.S_IRGRP | stat.S_IROTH)
+        os.replace(staging, target)
+
+    async def materialize(self, blob: Path, target: Path) -> bool:
+        """
+        Copy a blob to target and check it against its digest.
+        A blob that no longer matches is dropped from the cache and False is returned.
+        """
+        await asyncio.to_thread(clone_or_copy, blob, target)
+        if await asyncio.to_thread(file_digest, target) == blob.name:
+            return True
+        self._forget(blob.name)
+        with contextlib.suppress(FileNotFoundError):
+            await asyncio.to_thread(blob.unlink)
+        return False
+
+    async def _evict(self) -> None:
+        if self._total <= self.max_bytes:
+            return
+        for digest, _ in sorted(self._objects.items(), key=lambda item: item[1]["last_used"]):
+            if self._total <= self.max_bytes:
+                break
+            self._forget(digest)
+            with contextlib.suppress(FileNotFoundError):
+                await asyncio.to_thread(self._object_path(digest).unlink)
+
+    def _forget(self, digest: str) -> None:
+        entry = self._objects.pop(digest, None)
+        if entry:
+            self._total -= entry["size"]
+        self._keys = {key: value for key, value in self._keys.items() if value != digest}
+        self._dirty = True
+
+    def _touch(self) -> None:
+        self._dirty = True
+        if time.monotonic() - self._last_flush >= INDEX_FLUSH_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._dirty:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+        staging = self._index_path.with_suffix(".tmp")
+        staging.write_text(json.dumps({"keys": self._keys, "objects": self._objects}))
+        os.replace(staging, self._index_path)
+        self._dirty = False
+        self._last_flush = time.monotonic()
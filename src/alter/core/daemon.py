@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import os
+import signal
+from pathlib import Path
+from typing import Any, Optional
+
+from alter.core.downloader import DownloadManager, DownloadTask, TaskConfig
+from alter.core.models import DownloadProgress
+from alter.core.rpc import (
+    DEFAULT_SOCKET_PATH,
+    INVALID_PARAMS,
+    INVALID_REQUEST,
+    METHOD_NOT_FOUND,
+    STREAM_LIMIT,
+    TASK_NOT_FOUND,
+    RPCError,
+    decode_message,
+    make_error,
+    make_request,
+    make_result,
+    progress_to_dict,
+    request_from_dict,
+    task_id_from_dict,
+)
+
+
+def task_snapshot(
+    task: DownloadTask, progress: Optional[DownloadProgress] = None
+) -> dict[str, Any]:
+    snapshot = progress_to_dict(progress or task.progress())
+    snapshot["url"] = task.url
+    snapshot["output"] = str(task.output)
+    return snapshot
+
+
+class _Subscriber:
+    """
+    Progress feed for one connection.
+    Only the latest update per task is kept, so a slow client never makes the daemon buffer
+    every chunk-level notification.
+    """
+
+    def __init__(self, writer: asyncio.StreamWriter) -> None:
+        self._writer = writer
+        self._pending: dict[str, dict[str, Any]] = {}
+        self._wakeup = asyncio.Event()
+        self._flusher = asyncio.create_task(self._flush_loop())
+
+    def push(self, snapshot: dict[str, Any]) -> None:
+        self._pending[snapshot["task_id"]] = snapshot
+        self._wakeup.set()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            pending, self._pending = self._pending, {}
+            for snapshot in pending.values():
+                self._writer.write(make_request("progress", snapshot))
+            try:
+                await self._writer.drain()
+            except ConnectionError:
+                return
+
+    async def close(self) -> None:
+        self._flusher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._flusher
+
+
+class DownloadDaemon:
+    """Hosts a single DownloadManager and serves it over a Unix domain socket (JSON-RPC 2.0)."""
+
+    def __init__(
+        self,
+        socket_path: Optional[Path] = None,
+        config: Optional[TaskConfig] = None,
+        temp_root: Optional[Path] = None,
+    ) -> None:
+        self.socket_path = socket_path or DEFAULT_SOCKET_PATH
+        self._manager = DownloadManager(
+            temp_root=temp_root, config=config, progress_callback=self._broadcast
+        )
+        self._subscribers: set[_Subscriber] = set()
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._shutdown = asyncio.Event()
+
+    @property
+    def manager(self) -> DownloadManager:
+        return self._manager
+
+    async def start(self) -> None:
+        await self._claim_socket_path()
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path), limit=STREAM_LIMIT
+        )
+        os.chmod(self.socket_path, 0o600)
+
+    async def serve_forever(self) -> None:
+        await self.start()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            with contextlib.suppress(NotImplementedError, RuntimeError):
+                loop.add_signal_handler(sig, self._shutdown.set)
+        try:
+            await self._shutdown.wait()
+        finally:
+            await self.close()
+
+    def shutdown(self) -> None:
+        self._shutdown.set()
+
+    async def close(self) -> None:
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        # Stops the downloads and waits for their cleanup before the pool goes away
+        await self._manager.close()
+        for subscriber in list(self._subscribers):
+            await subscriber.close()
+        self._subscribers.clear()
+        with contextlib.suppress(OSError):
+            self.socket_path.unlink()
+
+    async def _claim_socket_path(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        if not self.socket_path.exists():
+            return
+        try:
+            _, writer = await asyncio.open_unix_connection(str(self.socket_path))
+        except OSError:
+            # Stale socket left behind by a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+            return
+        writer.close()
+        raise RuntimeError(f"An Alter daemon is already listening on {self.socket_path}")
+
+    def _broadcast(self, progress: DownloadProgress) -> None:
+        if not self._subscribers:
+            return
+        task = self._manager.get(progress.task_id)
+        if not task:
+            return
+        snapshot = task_snapshot(task, progress)
+        for subscriber in self._subscribers:
+            subscriber.push(snapshot)
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        subscriber: Optional[_Subscriber] = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                request_id = None
+                try:
+                    message = decode_message(line)
+                    request_id = message.get("id")
+                    method = message.get("method")
+                    params = message.get("params") or {}
+                    if not isinstance(method, str) or not isinstance(params, dict):
+                        raise RPCError(INVALID_REQUEST, "Invalid request")
+                    if method == "subscribe":
+                        if subscriber is None:
+                            subscriber = _Subscriber(writer)
+                            self._subscribers.add(subscriber)
+                        result: Any = [task_snapshot(task) for task in self._manager.list()]
+                    else:
+                        result = self._dispatch(method, params)
+                except (ValueError, TypeError) as exc:
+                    # Bad parameters fail the request, never the connection
+                    if request_id is not None:
+                        writer.write(make_error(request_id, RPCError(INVALID_PARAMS, str(exc))))
+                except RPCError as exc:
+                    if request_id is not None:
+                        writer.write(make_error(request_id, exc))
+                else:
+                    if request_id is not None:
+                        writer.write(make_result(request_id, result))
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if subscriber:
+                self._subscribers.discard(subscriber)
+                await subscriber.close()
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    def _dispatch(self, method: str, params: dict[str, Any]) -> Any:
+        if method == "add":
+            request = request_from_dict(params)
+            task_id = task_id_from_dict(params)
+            if task_id is not None and self._manager.get(task_id):
+                raise RPCError(INVALID_PARAMS, f"task_id {task_id} is already in use")
+            task = self._manager.add(request, task_id=task_id)
+            if params.get("start", True):
+                self._manager.start(task.id)
+            return task_snapshot(task)
+        if method == "list":
+            return [task_snapshot(task) for task in self._manager.list()]
+        if method == "get":
+            return task_snapshot(self._require_task(params))
+        if method in ("start", "pause", "resume", "stop"):
+            task = self._require_task(params)
+            getattr(self._manager, method)(task.id)
+            return task_snapshot(task)
+        if method == "remove":
+            task = self._require_task(params)
+            self._manager.remove(task.id)
+            task.stop()
+            return None
+        if method == "shutdown":
+            self.shutdown()
+            return None
+        raise RPCError(METHOD_NOT_FOUND, f"Method not found: {method}")
+
+    def _require_task(self, params: dict[str, Any]) -> DownloadTask:
+        task_id = params.get("task_id")
+        task = self._manager.get(task_id) if isinstance(task_id, str) else None
+        if not task:
+            raise RPCError(TASK_NOT_FOUND, f"Unknown task: {task_id}")
+        return task
@@ -1,25 +1,58 @@
 from __future__ import annotations
 
 import asyncio
+from collections import deque
 from dataclasses import dataclass
+import functools
+import hashlib
+import itertools
+import os
 from pathlib import Path
-from typing import Callable, Optional
+from typing import Any, AsyncContextManager, Awaitable, Callable, Coroutine, Mapping, Optional
 import re
 import shutil
+import socket
 import time
 import urllib.parse
 import uuid
 
 import aiofiles
 import aiohttp
+from aiohttp.abc import AbstractResolver, ResolveResult
+from yarl import URL
 
+from alter.core import profiling
+from alter.core.cache import (
+    DEFAULT_CACHE_MAX_BYTES,
+    ContentCache,
+    cache_validator,
+    clone_or_copy,
+    file_digest,
+)
+from alter.core.encoding import ContentDecoder, accept_encoding, content_codings
+from alter.core.extract import StreamExtractor
 from alter.core.models import DownloadProgress, DownloadRequest
+from alter.core.ranges import (
+    DEFAULT_RANGE_GAP,
+    ByteRange,
+    coalesce_ranges,
+    discover_size,
+    fetch_ranges,
+    parse_byte_range,
+    resolve_ranges,
+)
 
 
 DEFAULT_CHUNK_SIZE = 1024 * 1024
 DEFAULT_PARTS = 6
 DEFAULT_TIMEOUT = 30
 DEFAULT_MAX_CONNECTIONS = 4
+DEFAULT_KEEPALIVE_TIMEOUT = 30
+# How long a prefetched DNS answer is used; matches aiohttp's own DNS cache default
+PREFETCH_DNS_TTL = 10.0
+DURABILITY_LEVELS = ("fast", "safe", "strict")
+# "safe" and "strict" flush and fsync the output after at most this many bytes
+DEFAULT_SYNC_INTERVAL = 64 * 1024 * 1024
 
 
 @dataclass
@@ -28,6 +61,121 @@ class TaskConfig:
     chunk_size: int = DEFAULT_CHUNK_SIZE
     timeout: int = DEFAULT_TIMEOUT
     max_connections: int = DEFAULT_MAX_CONNECTIONS
+    # Files whose Content-Length is at most this many bytes skip the probe and multipart
+    # machinery and stream straight to their destination. 0 disables the fast path.
+    small_file_threshold: int = 0
+    # Manager-wide cap on concurrently running tasks; further tasks wait in a queue. 0 = no cap.
+    max_active_tasks: int = 0
+    # Content-addressed cache shared by the manager's tasks; None disables caching.
+    cache_dir: Optional[Path] = None
+    cache_max_bytes: int = DEFAULT_CACHE_MAX_BYTES
+    # Partial downloads merge requested byte ranges separated by at most this many bytes.
+    range_gap: int = DEFAULT_RANGE_GAP
+    # How many queued tasks to probe ahead of time, warming pooled connections. 0 disables.
+    prefetch_depth: int = 4
+    # Advertise gzip/br/zstd on single-stream GETs and decode off the event loop.
+    negotiate_encoding: bool = False
+    # Outputs are written under a hidden staging name and renamed into place when complete.
+    # "fast" never fsyncs; "safe" fsyncs at checkpoints and before the rename; "strict" also
+    # fsyncs the directory so the rename itself survives a crash.
+    durability: str = "fast"
+
+    def __post_init__(self) -> None:
+        if self.durability not in DURABILITY_LEVELS:
+            raise ValueError(
+                f"Unknown durability level {self.durability!r}; "
+                f"expected one of {', '.join(DURABILITY_LEVELS)}"
+            )
+
+
+class _PrefetchResolver(AbstractResolver):
+    """
+    aiohttp's default resolver behind a short-lived cache that prefetching fills.
+    aiohttp has no public way to open a pooled connection ahead of a request, but it does take
+    a pluggable resolver, so a queued task can at least have its DNS lookup done early.
+    """
+
+    def __init__(self) -> None:
+        self._resolver = aiohttp.DefaultResolver()
+        self._warm: dict[tuple[str, int, int], tuple[float, list[ResolveResult]]] = {}
+
+    async def resolve(
+        self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET
+    ) -> list[ResolveResult]:
+        entry = self._warm.pop((host, port, family), None)
+        if entry is not None and time.monotonic() - entry[0] <= PREFETCH_DNS_TTL:
+            return entry[1]
+        return await self._resolver.resolve(host, port, family)
+
+    async def warm(self, url: str, family: socket.AddressFamily = socket.AF_UNSPEC) -> None:
+        """Resolve a URL's host ahead of its first request; failures are left to that request."""
+        target = URL(url)
+        if target.raw_host is None or target.port is None:
+            return
+        now = time.monotonic()
+        self._warm = {
+            key: entry for key, entry in self._warm.items() if now - entry[0] <= PREFETCH_DNS_TTL
+        }
+        try:
+            addresses = await self._resolver.resolve(target.raw_host, target.port, family)
+        except OSError:
+            return
+        self._warm[(target.raw_host, target.port, family)] = (time.monotonic(), addresses)
+
+    async def close(self) -> None:
+        await self._resolver.close()
+
+
+def create_session(
+    config: TaskConfig, resolver: Optional[AbstractResolver] = None
+) -> aiohttp.ClientSession:
+    timeout = aiohttp.ClientTimeout(
+        total=None,
+        sock_connect=config.timeout,
+        sock_read=config.timeout,
+    )
+    # Concurrency is bounded per task (range semaphore) and per manager (max_active_tasks),
+    # so the pool itself only needs to keep idle connections alive for reuse.
+    connector = aiohttp.TCPConnector(
+        limit=0, keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT, resolver=resolver
+    )
+    # Sizes and ranges must describe the file itself, so compression is only ever requested
+    # explicitly (see TaskConfig.negotiate_encoding) rather than by aiohttp's default header.
+    return aiohttp.ClientSession(
+        timeout=timeout, connector=connector, headers={"Accept-Encoding": "identity"}
+    )
+
+
+async def probe_url(
+    session: aiohttp.ClientSession, url: str, encodings: Optional[str] = None
+) -> Optional[Mapping[str, str]]:
+    """
+    Fetch the response headers for a URL without downloading it.
+    Tries HEAD first and falls back to a GET for servers that reject HEAD; returns None if
+    neither succeeds. `encodings`, if given, is offered as Accept-Encoding.
+    """
+    headers = {"Accept-Encoding": encodings} if encodings else None
+    try:
+        async with session.head(url, headers=headers, allow_redirects=True) as response:
+            if response.status in range(200, 300):
+                return response.headers
+    except aiohttp.ClientError:
+        pass
+
+    try:
+        async with session.get(url, headers=headers) as response:
+            if response.status in range(200, 300):
+                return response.headers
+    except aiohttp.ClientError:
+        pass
+    return None
+
+
+def size_and_ranges(headers: Mapping[str, str]) -> tuple[Optional[int], bool]:
+    """Return the Content-Length (if any) and whether the server accepts byte ranges."""
+    size = headers.get("Content-Length")
+    accept_ranges = headers.get("Accept-Ranges", "")
+    return (int(size) if size else None), accept_ranges.lower() == "bytes"
 
 
 def compute_ranges(size: int, parts: int) -> list[tuple[int, int]]:
@@ -55,9 +203,9 @@ def _default_output_path(task_id: str) -> Path:
 def _sanitize_filename(filename: str) -> str:
     """Sanitize a filename by removing invalid characters."""
     # Remove or replace characters that are invalid in filenames
-    sanitized = re.sub(r'[<>:"/\\|?*\x00-\x1f]', '_', filename)
+    sanitized = re.sub(r'[<>:"/\\|?*\x00-\x1f]', "_", filename)
     # Remove leading/trailing dots and spaces
-    sanitized = sanitized.strip('. ')
+    sanitized = sanitized.strip(". ")
     # Ensure it's not empty
     return sanitized if sanitized else "download"
 
@@ -70,20 +218,20 @@ def _extract_filename_from_url(url: str) -> Optional[str]:
     try:
         parsed = urllib.parse.urlparse(url)
         path = urllib.parse.unquote(parsed.path)
-        
+
         # Get the last component of the path
-        if not path or path == '/':
+        if not path or path == "/":
             return None
-        
-        filename = path.rstrip('/').split('/')[-1]
-        
+
+        filename = path.rstrip("/").split("/")[-1]
+
         # Check if it looks like a file (has an extension)
-        if '.' in filename and not filename.startswith('.'):
+        if "." in filename and not filename.startswith("."):
             # Split into name and extension
-            parts = filename.rsplit('.', 1)
+            parts = filename.rsplit(".", 1)
             if len(parts) == 2 and parts[1] and len(parts[1]) <= 10:  # Reasonable extension length
                 return _sanitize_filename(filename)
-        
+
         return None
     except Exception:
         return None
@@ -94,22 +242,22 @@ def _extract_filename_from_headers(headers: dict) -> Optional[str]:
     Extract filename from Content-Disposition header.
     Returns None if no filename is found.
     """
-    content_disp = headers.get('Content-Disposition', '')
+    content_disp = headers.get("Content-Disposition", "")
     if not content_disp:
         return None
-    
+
     # Try to find filename* (RFC 5987) first
     match = re.search(r"filename\*=(?:UTF-8''|utf-8'')?([^;]+)", content_disp, re.IGNORECASE)
     if match:
-        filename = urllib.parse.unquote(match.group(1).strip('\'"'))
+        filename = urllib.parse.unquote(match.group(1).strip("'\""))
         return _sanitize_filename(filename)
-    
+
     # Try regular filename parameter
     match = re.search(r'filename="?([^";]+)"?', content_disp, re.IGNORECASE)
     if match:
-        filename = match.group(1).strip('\'"')
+        filename = match.group(1).strip("'\"")
         return _sanitize_filename(filename)
-    
+
     return None
 
 
@@ -121,110 +269,312 @@ def _get_url_fallback_name(url: str) -> str:
     try:
         parsed = urllib.parse.urlparse(url)
         path = urllib.parse.unquote(parsed.path)
-        
+
         # Get the last component
-        if path and path != '/':
-            last_part = path.rstrip('/').split('/')[-1]
+        if path and path != "/":
+            last_part = path.rstrip("/").split("/")[-1]
             if last_part:
                 sanitized = _sanitize_filename(last_part)
                 if sanitized:
                     return sanitized
-        
+
         # If path doesn't give us anything useful, try domain
         if parsed.netloc:
-            domain = parsed.netloc.split(':')[0]  # Remove port if present
+            domain = parsed.netloc.split(":")[0]  # Remove port if present
             return _sanitize_filename(domain)
-        
+
         return "download"
     except Exception:
         return "download"
 
 
+def resolve_output(request: DownloadRequest) -> tuple[Path, bool]:
+    """
+    Work out the initial output path for a request.
+    Returns the path and whether it was auto-named (and may be updated from headers).
+    """
+    if request.output:
+        return request.output, False
+
+    # Try to extract filename from URL, otherwise use fallback name
+    filename = _extract_filename_from_url(request.url) or _get_url_fallback_name(request.url)
+    if request.directory:
+        return request.directory / filename, True
+    return Path(filename), True
+
+
 def _ensure_parent(path: Path) -> None:
     if path.parent and not path.parent.exists():
         path.parent.mkdir(parents=True, exist_ok=True)
 
 
+def _prepare_output(path: Path) -> None:
+    _ensure_parent(path)
+    # Replace rather than truncate: the old file may be a hardlink into the content cache
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _staging_path(path: Path, task_id: str) -> Path:
+    # Hidden and next to the target, so the final rename never crosses filesystems. The id is
+    # hashed rather than spliced in, so a caller-supplied task_id cannot add path separators.
+    tag = hashlib.sha256(task_id.encode()).hexdigest()[:8]
+    return path.with_name(f".{path.name}.{tag}.part")
+
+
+def _fsync_path(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _commit_output(staging: Path, output: Path, durability: str) -> None:
+    if durability != "fast":
+        _fsync_path(staging)
+    os.replace(staging, output)
+    if durability == "strict" and hasattr(os, "O_DIRECTORY"):
+        # Persist the directory entry created by the rename
+        _fsync_path(output.absolute().parent)
+
+
+class _TransferStopped(Exception):
+    pass
+
+
+class _Checkpointer:
+    """Flushes and fsyncs an output file every `interval` bytes for the safe/strict levels."""
+
+    def __init__(
+        self,
+        task_id: str,
+        fileno: int,
+        flush: Optional[Callable[[], Awaitable[None]]] = None,
+        interval: int = DEFAULT_SYNC_INTERVAL,
+    ) -> None:
+        self._task_id = task_id
+        self._fileno = fileno
+        self._flush = flush
+        self._interval = interval
+        self._unsynced = 0
+
+    async def advance(self, size: int) -> None:
+        self._unsynced += size
+        if self._unsynced >= self._interval:
+            await self.sync()
+
+    async def sync(self) -> None:
+        self._unsynced = 0
+        if self._flush is not None:
+            await self._flush()
+        with profiling.span("fsync", self._task_id):
+            await asyncio.to_thread(os.fsync, self._fileno)
+
+
+class _PartTail:
+    """Tracks how far each ranged writer has got so parts can be consumed in order mid-download."""
+
+    def __init__(self, count: int) -> None:
+        self.written = [0] * count
+        self.closed = [False] * count
+        self._changed = asyncio.Event()
+
+    def advance(self, index: int, size: int) -> None:
+        self.written[index] += size
+        self._changed.set()
+
+    def close(self, index: int) -> None:
+        self.closed[index] = True
+        self._changed.set()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+        self._changed.clear()
+
+
+class _TaskRuntime:
+    """Synchronization and speed-tracking state for a task that is currently active."""
+
+    __slots__ = ("lock", "pause_event", "stop_event", "last_speed_time", "last_speed_bytes")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.pause_event = asyncio.Event()
+        self.pause_event.set()
+        self.stop_event = asyncio.Event()
+        self.last_speed_time = time.time()
+        self.last_speed_bytes = 0
+
+
 class DownloadTask:
+    # Very large queues hold one of these per entry, so no per-instance __dict__
+    __slots__ = (
+        "id",
+        "url",
+        "output",
+        "name",
+        "extract_to",
+        "sha256",
+        "byte_ranges",
+        "total",
+        "downloaded",
+        "wire_downloaded",
+        "wire_total",
+        "speed_bps",
+        "status",
+        "error",
+        "_auto_named",
+        "_temp_root",
+        "_config",
+        "_progress_callback",
+        "_finished_callback",
+        "_cache",
+        "_runtime",
+        "_runner",
+        "_temp_dir",
+        "_session",
+        "_extractor",
+        "_decoder",
+        "_validator",
+        "_source",
+        "_from_cache",
+        "_done",
+        "_prefetch",
+        "_probed",
+    )
+
     def __init__(
         self,
         request: DownloadRequest,
         temp_root: Path,
         config: TaskConfig,
         progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
+        task_id: Optional[str] = None,
+        finished_callback: Optional[Callable[["DownloadTask"], None]] = None,
+        cache: Optional[ContentCache] = None,
     ) -> None:
-        self.id = uuid.uuid4().hex
+        # The id and output path stay eager: the id keys the manager's task table and the name is
+        # shown for queued rows, and both cost about a microsecond next to the per-run state below
+        self.id = task_id or uuid.uuid4().hex
         self.url = request.url
-        
-        # Smart filename extraction
-        if request.output:
-            self.output = request.output
-            self._auto_named = False
-        else:
-            # Try to extract filename from URL
-            filename = _extract_filename_from_url(request.url)
-            if filename:
-                self.output = Path(filename)
-                self._auto_named = True  # May be updated from headers
-            else:
-                # Use fallback name
-                filename = _get_url_fallback_name(request.url)
-                self.output = Path(filename)
-                self._auto_named = True
-        
+        self.output, self._auto_named = resolve_output(request)
         self.name = self.output.name
+        self.extract_to = request.extract_to
+        self.sha256 = request.sha256
+        self.byte_ranges: Optional[tuple[ByteRange, ...]] = (
+            tuple(parse_byte_range(spec) for spec in request.byte_ranges)
+            if request.byte_ranges
+            else None
+        )
+        if self.byte_ranges and self.extract_to is not None:
+            raise ValueError("Partial downloads cannot be extracted")
         self._temp_root = temp_root
         self._config = config
         self._progress_callback = progress_callback
+        self._finished_callback = finished_callback
+        self._cache = cache
 
         self.total: Optional[int] = None
         self.downloaded = 0
+        # Bytes received off the wire, tracked separately once a compressed body is being decoded
+        self.wire_downloaded: Optional[int] = None
+        self.wire_total: Optional[int] = None
         self.speed_bps = 0.0
         self.status = "queued"
         self.error: Optional[str] = None
 
-        self._lock = asyncio.Lock()
-        self._pause_event = asyncio.Event()
-        self._pause_event.set()
-        self._stop_event = asyncio.Event()
+        # Locks, events and per-run state exist only while the task is active
+        self._runtime: Optional[_TaskRuntime] = None
         self._runner: Optional[asyncio.Task[None]] = None
-        self._last_speed_time = time.time()
-        self._last_speed_bytes = 0
         self._temp_dir: Optional[Path] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._extractor: Optional[StreamExtractor] = None
+        self._decoder: Optional[ContentDecoder] = None
+        self._validator: Optional[str] = None
+        self._source: Optional[DownloadTask] = None
+        self._from_cache = False
+        self._done: Optional[asyncio.Event] = None
+        self._prefetch: Optional[asyncio.Task[None]] = None
+        self._probed: Optional[tuple[Optional[int], bool, float]] = None
 
-    def start(self) -> None:
+    def start(
+        self,
+        session: Optional[aiohttp.ClientSession] = None,
+        source: Optional["DownloadTask"] = None,
+    ) -> None:
+        """
+        Start the download, on a shared session if one is given or on a private one otherwise.
+        With a source task fetching the same URL, wait for it and reuse its file instead.
+        """
         if self._runner and not self._runner.done():
             return
         try:
             loop = asyncio.get_running_loop()
         except RuntimeError as exc:
             raise RuntimeError("DownloadTask.start() requires a running event loop") from exc
+        self._runtime = _TaskRuntime()
+        self._session = session
+        self._source = source
         self._runner = loop.create_task(self._run())
 
+    async def wait(self) -> None:
+        """Wait until the task has finished, failed or been stopped."""
+        if self._runner is None and self.status != "queued":
+            return
+        if self._done is None:
+            self._done = asyncio.Event()
+        await self._done.wait()
+
     def pause(self) -> None:
         if self.status == "downloading":
-            self._pause_event.clear()
+            self._rt.pause_event.clear()
             self._set_status("paused")
 
     def resume(self) -> None:
         if self.status == "paused":
-            self._pause_event.set()
+            self._rt.pause_event.set()
             self._set_status("downloading")
 
     def stop(self) -> None:
-        self._stop_event.set()
+        if self._runtime is not None:
+            self._runtime.stop_event.set()
+        self._cancel_prefetch()
         if self.status not in ("completed", "error"):
             self._set_status("stopped")
+        if self._runner is None:
+            # Never started, so nothing else will mark it finished
+            self._release()
+
+    @property
+    def _rt(self) -> _TaskRuntime:
+        assert self._runtime is not None, "task is not active"
+        return self._runtime
+
+    def _release(self) -> None:
+        """Drop runtime state once the task is terminal and wake anyone waiting on it."""
+        self._runtime = None
+        self._runner = None
+        self._session = None
+        self._source = None
+        self._extractor = None
+        self._decoder = None
+        self._temp_dir = None
+        self._prefetch = None
+        self._probed = None
+        if self._done is not None:
+            self._done.set()
+            self._done = None
 
     def _set_status(self, status: str, error: Optional[str] = None) -> None:
         self.status = status
         self.error = error
         self._notify()
 
-    def _notify(self) -> None:
-        if not self._progress_callback:
-            return
-        update = DownloadProgress(
+    def progress(self) -> DownloadProgress:
+        return DownloadProgress(
             task_id=self.id,
             downloaded=self.downloaded,
             total=self.total,
@@ -232,114 +582,415 @@ class DownloadTask:
             status=self.status,
             name=self.name,
             error=self.error,
+            wire_downloaded=self.wire_downloaded,
+            wire_total=self.wire_total,
         )
-        self._progress_callback(update)
+
+    def _notify(self) -> None:
+        if not self._progress_callback:
+            return
+        self._progress_callback(self.progress())
 
     async def _update_progress(self, bytes_written: int) -> None:
-        async with self._lock:
+        with profiling.span("progress", self.id):
+            await self._count_progress(bytes_written)
+        with profiling.span("notify", self.id, sync=True):
+            self._notify()
+
+    async def _count_progress(self, bytes_written: int) -> None:
+        async with self._rt.lock:
             self.downloaded += bytes_written
             now = time.time()
-            elapsed = now - self._last_speed_time
+            elapsed = now - self._rt.last_speed_time
             if elapsed >= 0.5:
-                delta = self.downloaded - self._last_speed_bytes
+                # Speed is network throughput, so compressed bodies are measured on the wire
+                transferred = (
+                    self.downloaded if self.wire_downloaded is None else self.wire_downloaded
+                )
+                delta = transferred - self._rt.last_speed_bytes
                 self.speed_bps = delta / elapsed if elapsed > 0 else 0.0
-                self._last_speed_time = now
-                self._last_speed_bytes = self.downloaded
-        self._notify()
+                self._rt.last_speed_time = now
+                self._rt.last_speed_bytes = transferred
 
     async def _wait_if_paused(self) -> None:
-        while not self._pause_event.is_set():
-            if self._stop_event.is_set():
+        while not self._rt.pause_event.is_set():
+            if self._rt.stop_event.is_set():
                 return
             await asyncio.sleep(0.1)
-        await self._pause_event.wait()
+        await self._rt.pause_event.wait()
 
-    async def _probe(self, session: aiohttp.ClientSession) -> tuple[Optional[int], bool]:
-        """Probe the URL to get file size and check if ranges are supported."""
-        try:
-            async with session.head(self.url, allow_redirects=True) as response:
-                if response.status in range(200, 300):
-                    # Try to extract filename from headers if auto-named
-                    if self._auto_named:
-                        header_filename = _extract_filename_from_headers(dict(response.headers))
-                        if header_filename:
-                            self.output = Path(self.output.parent, header_filename) if self.output.parent and str(self.output.parent) != '.' else Path(header_filename)
-                            self.name = self.output.name
-                    
-                    size = response.headers.get("Content-Length")
-                    accept_ranges = response.headers.get("Accept-Ranges", "")
-                    total = int(size) if size else None
-                    supports_ranges = accept_ranges.lower() == "bytes"
-                    return total, supports_ranges
-        except aiohttp.ClientError:
-            pass
+    def _apply_response_headers(self, headers: Mapping[str, str]) -> tuple[Optional[int], bool]:
+        # Try to extract filename from headers if auto-named
+        self._validator = cache_validator(headers)
+        if self._auto_named:
+            header_filename = _extract_filename_from_headers(dict(headers))
+            if header_filename:
+                self.output = (
+                    Path(self.output.parent, header_filename)
+                    if self.output.parent and str(self.output.parent) != "."
+                    else Path(header_filename)
+                )
+                self.name = self.output.name
+
+        total, supports_ranges = size_and_ranges(headers)
+        if self._negotiated(headers):
+            # Length and ranges then describe the compressed representation, not the file
+            return None, False
+        return total, supports_ranges
+
+    def _negotiated(self, headers: Mapping[str, str]) -> bool:
+        """Whether a response carries a coding we asked for and decode ourselves."""
+        return self._config.negotiate_encoding and bool(
+            content_codings(headers.get("Content-Encoding", ""))
+        )
 
+    def prefetch(
+        self, session: aiohttp.ClientSession, resolver: Optional[_PrefetchResolver] = None
+    ) -> None:
+        """
+        Prepare a queued task ahead of time.
+        The probe resolves DNS, leaves a warm keep-alive connection in the shared pool and
+        records size and range support, so the task's first request once started is the data
+        request. Tasks on the small-file fast path never probe, so only their DNS is resolved.
+        """
+        if self._prefetch or self._probed or self._runner or self.status != "queued":
+            return
+        if self._config.small_file_threshold > 0:
+            if resolver is None:
+                return
+            work: Coroutine[Any, Any, None] = resolver.warm(self.url)
+        else:
+            work = self._run_prefetch(session)
+        self._prefetch = asyncio.get_running_loop().create_task(work)
+
+    async def _run_prefetch(self, session: aiohttp.ClientSession) -> None:
         try:
-            async with session.get(self.url) as response:
-                if response.status not in range(200, 300):
-                    return None, False
-                
-                # Try to extract filename from headers if auto-named
-                if self._auto_named:
-                    header_filename = _extract_filename_from_headers(dict(response.headers))
-                    if header_filename:
-                        self.output = Path(self.output.parent, header_filename) if self.output.parent and str(self.output.parent) != '.' else Path(header_filename)
-                        self.name = self.output.name
-                
-                size = response.headers.get("Content-Length")
-                accept_ranges = response.headers.get("Accept-Ranges", "")
-                total = int(size) if size else None
-                supports_ranges = accept_ranges.lower() == "bytes"
-                return total, supports_ranges
-        except aiohttp.ClientError:
+            total, supports_ranges = await self._probe(session)
+        except Exception:
+            # Best effort only; the task probes again when it runs
+            return
+        self._probed = (total, supports_ranges, time.monotonic())
+        self.total = total
+        self._notify()
+
+    def _cancel_prefetch(self) -> None:
+        if self._prefetch and not self._prefetch.done():
+            self._prefetch.cancel()
+
+    async def _take_probe(self) -> Optional[tuple[Optional[int], bool]]:
+        """Return a fresh prefetched probe result, waiting for one that is still in flight."""
+        if self._prefetch is not None:
+            # wait() rather than await so a cancelled prefetch does not cancel the transfer
+            await asyncio.wait([self._prefetch])
+            self._prefetch = None
+        probed, self._probed = self._probed, None
+        if probed is None or time.monotonic() - probed[2] > DEFAULT_KEEPALIVE_TIMEOUT:
+            return None
+        return probed[0], probed[1]
+
+    async def _probe(self, session: aiohttp.ClientSession) -> tuple[Optional[int], bool]:
+        """Probe the URL to get file size and check if ranges are supported."""
+        # When negotiating, the probe shows whether the server would compress the body
+        encodings = accept_encoding() if self._config.negotiate_encoding else None
+        headers = await probe_url(session, self.url, encodings)
+        if headers is None:
             return None, False
+        return self._apply_response_headers(headers)
 
     async def _run(self) -> None:
+        profiling.describe(self.id, self.name)
         try:
             self._set_status("downloading")
-            timeout = aiohttp.ClientTimeout(
-                total=None,
-                sock_connect=self._config.timeout,
-                sock_read=self._config.timeout,
-            )
-            connector = aiohttp.TCPConnector(limit=self._config.max_connections)
-            async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
-                self.total, supports_ranges = await self._probe(session)
-                if not supports_ranges or not self.total or self._config.parts <= 1:
-                    await self._download_single(session)
-                else:
-                    await self._download_multipart(session, self.total)
-
-            if self._stop_event.is_set():
+            if self._session is not None:
+                await self._transfer(self._session)
+            else:
+                async with create_session(self._config) as session:
+                    await self._transfer(session)
+
+            if self._rt.stop_event.is_set():
                 await self._cleanup_partial()
                 return
+            await self._finalize()
             self._set_status("completed")
         except Exception as exc:
             await self._cleanup_partial()
             self._set_status("error", str(exc))
+        finally:
+            self._release()
+            if self._finished_callback:
+                self._finished_callback(self)
 
-    async def _cleanup_partial(self) -> None:
+    async def _transfer(self, session: aiohttp.ClientSession) -> None:
+        if self.byte_ranges:
+            await self._download_byte_ranges(session, self.byte_ranges)
+            return
+        if self._source is not None:
+            if await self._follow(self._source) or self._rt.stop_event.is_set():
+                return
+        # A known digest can be served without touching the network at all
+        if await self._serve_cached():
+            return
+        await self._fetch(session)
+        if self._rt.stop_event.is_set() or self._from_cache:
+            return
+        if self._extractor is not None:
+            await self._extractor.finish()
+        elif self.sha256 or self._cache is not None:
+            await self._verify_and_cache()
+
+    async def _follow(self, source: "DownloadTask") -> bool:
+        """Attach to an in-flight task for the same URL and copy its result once it is done."""
+        waiters = [
+            asyncio.ensure_future(source.wait()),
+            asyncio.ensure_future(self._rt.stop_event.wait()),
+        ]
         try:
-            if self.output.exists():
-                await asyncio.to_thread(self.output.unlink)
-        except OSError:
-            pass
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        if self._rt.stop_event.is_set() or source.status != "completed":
+            return False
+        if await self._serve_cached():
+            return True
+        if not source.output.exists():
+            return False
+        if source.output.resolve() == self.output.absolute().resolve():
+            if self.sha256:
+                await self._verify(self.output)
+            self.total = source.total
+            await self._update_progress(self.output.stat().st_size)
+            return True
+        staging = self._staging()
+        _prepare_output(staging)
+        await asyncio.to_thread(clone_or_copy, source.output, staging)
+        # The primary only checked its own digest, if it had one
+        if self.sha256:
+            await self._verify(staging)
+        self.total = source.total
+        await self._update_progress(staging.stat().st_size)
+        return True
+
+    def _cached_blob(self) -> Optional[Path]:
+        if self._cache is None or self.extract_to is not None or self.byte_ranges:
+            return None
+        if self.sha256:
+            # Whatever the URL last held may not be the content this request expects
+            return self._cache.lookup_digest(self.sha256)
+        return self._cache.lookup(self.url, self._validator)
+
+    async def _serve_cached(self) -> bool:
+        blob = self._cached_blob()
+        if blob is None or self._cache is None:
+            return False
+        staging = self._staging()
+        with profiling.span("cache", self.id):
+            served = await self._cache.materialize(blob, staging)
+        if not served:
+            staging.unlink(missing_ok=True)
+            return False
+        size = staging.stat().st_size
+        self.total = size
+        self._from_cache = True
+        await self._update_progress(size)
+        return True
+
+    async def _verify(self, path: Path) -> str:
+        with profiling.span("verify", self.id):
+            digest = await asyncio.to_thread(file_digest, path)
+        if self.sha256 and digest != self.sha256.lower():
+            raise ValueError(f"SHA-256 mismatch: expected {self.sha256}, got {digest}")
+        return digest
+
+    async def _verify_and_cache(self) -> None:
+        digest = await self._verify(self._staging())
+        if self._cache is not None:
+            with profiling.span("cache", self.id):
+                await self._cache.store(self.url, self._validator, self._staging(), digest)
+
+    def _staging(self) -> Path:
+        return _staging_path(self.output, self.id)
+
+    def _checkpointer(
+        self, fileno: int, flush: Optional[Callable[[], Awaitable[None]]] = None
+    ) -> Optional[_Checkpointer]:
+        if self._config.durability == "fast":
+            return None
+        return _Checkpointer(self.id, fileno, flush)
+
+    async def _finalize(self) -> None:
+        """Move the finished file from its staging name into place."""
+        staging = self._staging()
+        if not staging.exists():
+            # Extracted, or already in place (a duplicate of the same output path)
+            return
+        with profiling.span("finalize", self.id):
+            await asyncio.to_thread(_commit_output, staging, self.output, self._config.durability)
+
+    async def _fetch(self, session: aiohttp.ClientSession) -> None:
+        prefetched = await self._take_probe()
+        if prefetched is not None:
+            self.total, supports_ranges = prefetched
+        elif self._config.small_file_threshold > 0:
+            probed = await self._download_small(session)
+            if probed is None:
+                return
+            self.total, supports_ranges = probed
+        else:
+            self.total, supports_ranges = await self._probe(session)
+        if await self._serve_cached():
+            return
+        if (
+            not supports_ranges
+            or not self.total
+            or self._config.parts <= 1
+            or self.total <= self._config.small_file_threshold
+        ):
+            await self._download_single(session)
+        else:
+            await self._download_multipart(session, self.total)
+
+    async def _cleanup_partial(self) -> None:
+        if self._extractor is not None:
+            # The archive itself was never written; already extracted entries are left in place
+            await self._extractor.abort()
+        else:
+            # The previous file at the output path, if any, is left untouched
+            try:
+                await asyncio.to_thread(self._staging().unlink)
+            except OSError:
+                pass
         if self._temp_dir:
             await asyncio.to_thread(shutil.rmtree, self._temp_dir, ignore_errors=True)
 
+    async def _stream_response(
+        self,
+        response: aiohttp.ClientResponse,
+        consume: Callable[[bytes], Awaitable[object]],
+        stage: str = "write",
+    ) -> None:
+        decoder = self._decoder
+        chunks = response.content.iter_chunked(self._config.chunk_size)
+        async for chunk in profiling.timed(chunks, "network", self.id):
+            if not chunk:
+                continue
+            if self._rt.stop_event.is_set():
+                return
+            await self._wait_if_paused()
+            if decoder is not None:
+                assert self.wire_downloaded is not None
+                self.wire_downloaded += len(chunk)
+                with profiling.span("decode", self.id):
+                    chunk = await asyncio.to_thread(decoder.decompress, chunk)
+                if not chunk:
+                    await self._update_progress(0)
+                    continue
+            with profiling.span(stage, self.id):
+                await consume(chunk)
+            await self._update_progress(len(chunk))
+        if decoder is not None and not self._rt.stop_event.is_set():
+            with profiling.span("decode", self.id):
+                tail = await asyncio.to_thread(decoder.flush)
+            if tail:
+                with profiling.span(stage, self.id):
+                    await consume(tail)
+            self.total = self.downloaded + len(tail)
+            await self._update_progress(len(tail))
+
+    async def _write_response(
+        self,
+        response: aiohttp.ClientResponse,
+        path: Path,
+        on_written: Optional[Callable[[int], None]] = None,
+        durable: bool = False,
+    ) -> None:
+        # Parts that are tailed while downloading must hit the file immediately
+        async with aiofiles.open(path, "wb", buffering=0 if on_written else -1) as handle:
+            checkpoint = self._checkpointer(handle.fileno(), handle.flush) if durable else None
+            if on_written is None and checkpoint is None:
+                await self._stream_response(response, handle.write)
+                return
+
+            async def write(chunk: bytes) -> None:
+                await handle.write(chunk)
+                if on_written is not None:
+                    on_written(len(chunk))
+                if checkpoint is not None:
+                    await checkpoint.advance(len(chunk))
+
+            # The final fsync happens once, just before the rename (_commit_output)
+            await self._stream_response(response, write)
+
+    async def _deliver(self, response: aiohttp.ClientResponse) -> None:
+        """Send a whole response body to the output file, or to the extractor when extracting."""
+        if self.extract_to is not None:
+            await self._stream_response(response, self._open_extractor().feed, "extract")
+            return
+        staging = self._staging()
+        _prepare_output(staging)
+        await self._write_response(response, staging, durable=True)
+
+    def _open_extractor(self) -> StreamExtractor:
+        # Opened once headers are in, since Content-Disposition may rename an auto-named task
+        if self._extractor is None:
+            assert self.extract_to is not None
+            self._extractor = StreamExtractor(self.extract_to, self.name)
+        return self._extractor
+
+    async def _download_small(
+        self, session: aiohttp.ClientSession
+    ) -> Optional[tuple[Optional[int], bool]]:
+        """
+        Small-file fast path: skip the probe and issue the data GET straight away.
+        If the response turns out to be small (or cannot be split anyway) it is streamed
+        directly to the destination and None is returned; otherwise the connection is
+        dropped and the learned (size, supports_ranges) is returned for the regular path.
+        """
+        async with self._get_whole(session) as response:
+            response.raise_for_status()
+            total, supports_ranges = self._apply_response_headers(response.headers)
+            encoded = self._start_decoding(response)
+            splittable = supports_ranges and bool(total) and self._config.parts > 1 and not encoded
+            if splittable and total is not None and total > self._config.small_file_threshold:
+                return total, supports_ranges
+            if await self._serve_cached():
+                return None
+            if not encoded:
+                self.total = total
+            await self._deliver(response)
+        return None
+
     async def _download_single(self, session: aiohttp.ClientSession) -> None:
-        _ensure_parent(self.output)
-        async with session.get(self.url) as response:
+        async with self._get_whole(session) as response:
             response.raise_for_status()
-            async with aiofiles.open(self.output, "wb") as handle:
-                async for chunk in response.content.iter_chunked(self._config.chunk_size):
-                    if not chunk:
-                        continue
-                    if self._stop_event.is_set():
-                        return
-                    await self._wait_if_paused()
-                    await handle.write(chunk)
-                    await self._update_progress(len(chunk))
+            self._start_decoding(response)
+            await self._deliver(response)
+
+    def _get_whole(
+        self, session: aiohttp.ClientSession
+    ) -> AsyncContextManager[aiohttp.ClientResponse]:
+        """GET the whole body, offering compressed codings when negotiation is enabled."""
+        if not self._config.negotiate_encoding:
+            return session.get(self.url)
+        return session.get(
+            self.url, headers={"Accept-Encoding": accept_encoding()}, auto_decompress=False
+        )
+
+    def _start_decoding(self, response: aiohttp.ClientResponse) -> bool:
+        """
+        Set up decoding for a negotiated compressed response.
+        Content-Length then counts wire bytes, so it becomes the wire total and the decoded size
+        is left unknown.
+        """
+        if not self._negotiated(response.headers):
+            return False
+        self._decoder = ContentDecoder(response.headers["Content-Encoding"])
+        self.wire_total = response.content_length
+        self.wire_downloaded = 0
+        self._rt.last_speed_bytes = 0
+        self.total = None
+        self._notify()
+        return True
 
     async def _download_range(
         self,
@@ -348,37 +999,114 @@ class DownloadTask:
         end: int,
         path: Path,
         semaphore: asyncio.Semaphore,
+        tail: Optional[_PartTail] = None,
+        index: int = 0,
     ) -> None:
         headers = {"Range": f"bytes={start}-{end}"}
-        async with semaphore:
-            async with session.get(self.url, headers=headers) as response:
-                if response.status != 206:
-                    raise aiohttp.ClientResponseError(
-                        response.request_info,
-                        response.history,
-                        status=response.status,
-                        message="Range request failed",
-                    )
-                async with aiofiles.open(path, "wb") as handle:
-                    async for chunk in response.content.iter_chunked(self._config.chunk_size):
-                        if not chunk:
-                            continue
-                        if self._stop_event.is_set():
-                            return
-                        await self._wait_if_paused()
-                        await handle.write(chunk)
-                        await self._update_progress(len(chunk))
+        on_written = functools.partial(tail.advance, index) if tail else None
+        try:
+            async with semaphore:
+                async with session.get(self.url, headers=headers) as response:
+                    if response.status != 206:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message="Range request failed",
+                        )
+                    await self._write_response(response, path, on_written)
+        finally:
+            if tail:
+                tail.close(index)
+
+    async def _consume_parts(
+        self,
+        part_paths: list[Path],
+        ranges: list[tuple[int, int]],
+        tail: _PartTail,
+    ) -> None:
+        """Feed the extractor from the part files in order, as soon as contiguous bytes exist."""
+        extractor = self._open_extractor()
+        for index, (path, (start, end)) in enumerate(zip(part_paths, ranges)):
+            size = end - start + 1
+            offset = 0
+            handle = None
+            try:
+                while offset < size:
+                    available = tail.written[index] - offset
+                    if available <= 0:
+                        if tail.closed[index]:
+                            if self._rt.stop_event.is_set():
+                                return
+                            raise IOError(f"Range {start}-{end} ended after {offset} bytes")
+                        await tail.wait()
+                        continue
+                    if handle is None:
+                        handle = await aiofiles.open(path, "rb")
+                    chunk = await handle.read(min(available, self._config.chunk_size))
+                    offset += len(chunk)
+                    await extractor.feed(chunk)
+            finally:
+                if handle is not None:
+                    await handle.close()
+
+    async def _download_byte_ranges(
+        self, session: aiohttp.ClientSession, byte_ranges: tuple[ByteRange, ...]
+    ) -> None:
+        """Fetch only the requested ranges into a sparse file of the resource's full size."""
+        prefetched = await self._take_probe()
+        size, _ = prefetched if prefetched is not None else await self._probe(session)
+        if not size:
+            size = await discover_size(session, self.url)
+        wanted = coalesce_ranges(resolve_ranges(byte_ranges, size), self._config.range_gap)
+        self.total = sum(end - start + 1 for start, end in wanted)
+
+        staging = self._staging()
+        _prepare_output(staging)
+        fd = os.open(staging, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        checkpoint = self._checkpointer(fd)
+        try:
+            os.ftruncate(fd, size)
+
+            async def write(offset: int, chunk: bytes) -> None:
+                if self._rt.stop_event.is_set():
+                    raise _TransferStopped()
+                await self._wait_if_paused()
+                # Positional writes: several responses land in the same file concurrently
+                with profiling.span("write", self.id):
+                    await asyncio.to_thread(os.pwrite, fd, chunk, offset)
+                if checkpoint is not None:
+                    await checkpoint.advance(len(chunk))
+                await self._update_progress(len(chunk))
+
+            await fetch_ranges(
+                session,
+                self.url,
+                wanted,
+                write,
+                self._config.max_connections,
+                self._config.chunk_size,
+            )
+        except _TransferStopped:
+            pass
+        finally:
+            os.close(fd)
 
     async def _merge_parts(self, part_paths: list[Path]) -> None:
-        _ensure_parent(self.output)
-        async with aiofiles.open(self.output, "wb") as target:
-            for path in part_paths:
-                async with aiofiles.open(path, "rb") as handle:
-                    while True:
-                        chunk = await handle.read(self._config.chunk_size)
-                        if not chunk:
-                            break
-                        await target.write(chunk)
+        staging = self._staging()
+        _prepare_output(staging)
+        with profiling.span("merge", self.id):
+            async with aiofiles.open(staging, "wb") as target:
+                checkpoint = self._checkpointer(target.fileno(), target.flush)
+                for path in part_paths:
+                    async with aiofiles.open(path, "rb") as handle:
+                        while True:
+                            chunk = await handle.read(self._config.chunk_size)
+                            if not chunk:
+                                break
+                            await target.write(chunk)
+                            if checkpoint is not None:
+                                await checkpoint.advance(len(chunk))
 
     async def _download_multipart(self, session: aiohttp.ClientSession, total: int) -> None:
         ranges = compute_ranges(total, self._config.parts)
@@ -389,10 +1117,16 @@ class DownloadTask:
 
         max_connections = max(1, min(self._config.max_connections, len(ranges)))
         semaphore = asyncio.Semaphore(max_connections)
+        tail = _PartTail(len(ranges)) if self.extract_to is not None else None
         tasks = [
-            asyncio.create_task(self._download_range(session, start, end, path, semaphore))
-            for (start, end), path in zip(ranges, part_paths)
+            asyncio.create_task(
+                self._download_range(session, start, end, path, semaphore, tail, index)
+            )
+            for index, ((start, end), path) in enumerate(zip(ranges, part_paths))
         ]
+        if tail:
+            # Extraction replaces the merge step and runs alongside the ranged writers
+            tasks.append(asyncio.create_task(self._consume_parts(part_paths, ranges, tail)))
 
         try:
             await asyncio.gather(*tasks)
@@ -402,11 +1136,12 @@ class DownloadTask:
             await asyncio.gather(*tasks, return_exceptions=True)
             raise
 
-        if self._stop_event.is_set():
+        if self._rt.stop_event.is_set():
             await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
             return
 
-        await self._merge_parts(part_paths)
+        if not tail:
+            await self._merge_parts(part_paths)
         await asyncio.to_thread(shutil.rmtree, temp_dir, ignore_errors=True)
 
 
@@ -421,9 +1156,29 @@ class DownloadManager:
         self._config = config or TaskConfig()
         self._progress_callback = progress_callback
         self._tasks: dict[str, DownloadTask] = {}
+        self._pending: deque[str] = deque()
+        self._pending_ids: set[str] = set()
+        self._active: set[str] = set()
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._resolver: Optional[_PrefetchResolver] = None
+        # URL -> the task currently fetching it, so duplicate requests can attach to it
+        self._inflight: dict[str, DownloadTask] = {}
+        self._cache = (
+            ContentCache(self._config.cache_dir, self._config.cache_max_bytes)
+            if self._config.cache_dir
+            else None
+        )
 
-    def add(self, request: DownloadRequest) -> DownloadTask:
-        task = DownloadTask(request, self._temp_root, self._config, self._progress_callback)
+    def add(self, request: DownloadRequest, task_id: Optional[str] = None) -> DownloadTask:
+        task = DownloadTask(
+            request,
+            self._temp_root,
+            self._config,
+            self._progress_callback,
+            task_id=task_id,
+            finished_callback=self._task_finished,
+            cache=self._cache,
+        )
         self._tasks[task.id] = task
         task._notify()
         return task
@@ -433,8 +1188,67 @@ class DownloadManager:
 
     def start(self, task_id: str) -> None:
         task = self.get(task_id)
-        if task:
-            task.start()
+        if not task or task_id in self._active:
+            return
+        if task.extract_to is None and not task.byte_ranges:
+            primary = self._inflight.get(task.url)
+            if (
+                primary
+                and primary is not task
+                and primary.status in ("queued", "downloading", "paused")
+            ):
+                # Followers hold no connections while waiting, so they bypass the active cap
+                task.start(source=primary)
+                return
+            self._inflight[task.url] = task
+        limit = self._config.max_active_tasks
+        if limit > 0 and len(self._active) >= limit:
+            if task_id not in self._pending_ids:
+                self._pending_ids.add(task_id)
+                self._pending.append(task_id)
+                self._prefetch_pending()
+            return
+        self._launch(task)
+
+    def _launch(self, task: DownloadTask) -> None:
+        self._active.add(task.id)
+        task.start(session=self.shared_session())
+
+    def shared_session(self) -> aiohttp.ClientSession:
+        # Created lazily so the manager can be built outside a running event loop;
+        # every task reuses its pooled keep-alive connections.
+        if self._session is None or self._session.closed:
+            self._resolver = _PrefetchResolver()
+            self._session = create_session(self._config, self._resolver)
+        return self._session
+
+    def _task_finished(self, task: DownloadTask) -> None:
+        self._active.discard(task.id)
+        if self._inflight.get(task.url) is task:
+            del self._inflight[task.url]
+        limit = self._config.max_active_tasks
+        while self._pending and (limit <= 0 or len(self._active) < limit):
+            next_id = self._pending.popleft()
+            self._pending_ids.discard(next_id)
+            next_task = self.get(next_id)
+            if next_task and next_task.status == "queued":
+                self._launch(next_task)
+        self._prefetch_pending()
+
+    def _prefetch_pending(self) -> None:
+        """
+        Prepare the next few queued tasks while the active ones transfer.
+        aiohttp has no explicit pre-connect, so the HEAD requests are what resolve DNS and open the
+        connections; they go back to the shared pool warm for the task's data request. Fast-path
+        tasks skip the probe and only have DNS resolved.
+        """
+        depth = self._config.prefetch_depth
+        if depth <= 0:
+            return
+        for task_id in itertools.islice(self._pending, depth):
+            task = self.get(task_id)
+            if task and task.status == "queued":
+                task.prefetch(self.shared_session(), self._resolver)
 
     def pause(self, task_id: str) -> None:
         task = self.get(task_id)
@@ -455,4 +1269,35 @@ class DownloadManager:
         return list(self._tasks.values())
 
     def remove(self, task_id: str) -> None:
-        self._tasks.pop(task_id, None)
+        task = self._tasks.pop(task_id, None)
+        if task is None:
+            return
+        if task_id in self._pending_ids:
+            self._pending_ids.discard(task_id)
+            self._pending.remove(task_id)
+        self._drop(task)
+
+    def _drop(self, task: DownloadTask) -> None:
+        # A task that never ran has nothing else to mark it finished, so waiters would hang
+        if task.status == "queued" and task._runner is None:
+            task.stop()
+
+    async def close(self) -> None:
+        """
+        Drop queued work, stop running downloads and release the shared connection pool.
+        Runners are awaited first so they can remove their partial files while the pool is open.
+        """
+        self._pending.clear()
+        self._pending_ids.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.stop()
+        await asyncio.gather(*(task.wait() for task in tasks))
+        if self._cache is not None:
+            self._cache.flush()
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import importlib.util
+import zlib
+from typing import Any, Callable
+
+
+_IDENTITY = ("", "identity")
+
+
+def supported_encodings() -> list[str]:
+    """Content codings this install can decode, in order of preference."""
+    encodings = []
+    if importlib.util.find_spec("zstandard") is not None:
+        encodings.append("zstd")
+    if importlib.util.find_spec("brotli") is not None:
+        encodings.append("br")
+    encodings.extend(["gzip", "deflate"])
+    return encodings
+
+
+def accept_encoding() -> str:
+    return ", ".join(supported_encodings())
+
+
+def content_codings(header: str) -> list[str]:
+    """Split a Content-Encoding header into its codings, in the order they were applied."""
+    return [
+        coding.strip().lower()
+        for coding in header.split(",")
+        if coding.strip().lower() not in _IDENTITY
+    ]
+
+
+class _ZlibDecoder:
+    """gzip (possibly multi-member) or deflate, zlib-wrapped or raw as some servers send it."""
+
+    def __init__(self, gzip: bool) -> None:
+        self._gzip = gzip
+        self._wbits = 16 + zlib.MAX_WBITS if gzip else zlib.MAX_WBITS
+        self._decompressor = zlib.decompressobj(self._wbits)
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        output = bytearray()
+        while data:
+            try:
+                output += self._decompressor.decompress(data)
+            except zlib.error:
+                if self._gzip or self._started:
+                    raise
+                self._wbits = -zlib.MAX_WBITS
+                self._decompressor = zlib.decompressobj(self._wbits)
+                output += self._decompressor.decompress(data)
+            self._started = True
+            data = self._decompressor.unused_data
+            if data:
+                if not self._gzip:
+                    raise ValueError("Trailing data after deflate stream")
+                self._decompressor = zlib.decompressobj(self._wbits)
+        return bytes(output)
+
+    def flush(self) -> bytes:
+        if self._started and not self._decompressor.eof:
+            raise ValueError("Compressed stream ended early")
+        return self._decompressor.flush()
+
+
+class _BrotliDecoder:
+    def __init__(self) -> None:
+        try:
+            import brotli
+        except ImportError as exc:
+            raise RuntimeError(
+                "Brotli support requires the 'brotli' package (pip install alter[brotli])"
+            ) from exc
+        self._decompressor = brotli.Decompressor()
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        if not data:
+            return b""
+        self._started = True
+        output: bytes = self._decompressor.process(data)
+        return output
+
+    def flush(self) -> bytes:
+        if self._started and not self._decompressor.is_finished():
+            raise ValueError("Compressed stream ended early")
+        return b""
+
+
+class _ZstdDecoder:
+    """zstd, possibly several concatenated frames; a decompressobj only handles one."""
+
+    def __init__(self) -> None:
+        try:
+            import zstandard
+        except ImportError as exc:
+            raise RuntimeError(
+                "Zstandard support requires the 'zstandard' package (pip install alter[zstd])"
+            ) from exc
+        self._context = zstandard.ZstdDecompressor()
+        self._decompressor = self._context.decompressobj()
+        self._started = False
+
+    def decompress(self, data: bytes) -> bytes:
+        output = bytearray()
+        while data:
+            if self._decompressor.eof:
+                self._decompressor = self._context.decompressobj()
+            output += self._decompressor.decompress(data)
+            self._started = True
+            data = self._decompressor.unused_data
+        return bytes(output)
+
+    def flush(self) -> bytes:
+        if self._started and not self._decompressor.eof:
+            raise ValueError("Compressed stream ended early")
+        return b""
+
+
+class ContentDecoder:
+    """
+    Incremental decoder for a Content-Encoding chain such as "gzip" or "deflate, br".
+    decompress() and flush() do CPU-bound work and are meant to be called from a worker thread.
+    """
+
+    def __init__(self, header: str) -> None:
+        codings = content_codings(header)
+        factories: dict[str, Callable[[], Any]] = {
+            "gzip": lambda: _ZlibDecoder(gzip=True),
+            "x-gzip": lambda: _ZlibDecoder(gzip=True),
+            "deflate": lambda: _ZlibDecoder(gzip=False),
+            "br": _BrotliDecoder,
+            "zstd": _ZstdDecoder,
+        }
+        unknown = [coding for coding in codings if coding not in factories]
+        if unknown:
+            raise ValueError(f"Unsupported Content-Encoding: {', '.join(unknown)}")
+        # Codings are listed in the order applied, so they are undone last to first
+        self._stages = [factories[coding]() for coding in reversed(codings)]
+
+    def decompress(self, data: bytes) -> bytes:
+        for stage in self._stages:
+            data = stage.decompress(data)
+        return data
+
+    def flush(self) -> bytes:
+        data = b""
+        for stage in self._stages:
+            data = stage.decompress(data) + stage.flush()
+        return data
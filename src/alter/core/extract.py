@@ -0,0 +1,368 @@
+from __future__ import annotations
+
+import asyncio
+import bz2
+import contextlib
+import gzip
+import io
+import lzma
+import queue
+import shutil
+import struct
+import tarfile
+import threading
+import zlib
+from pathlib import Path
+from typing import IO, Any, Callable, Literal, Optional, Protocol, cast
+
+
+# Longest suffixes first so ".tar.gz" wins over ".gz"
+_ARCHIVE_SUFFIXES: list[tuple[str, str]] = [
+    (".tar.gz", "tar.gz"),
+    (".tar.bz2", "tar.bz2"),
+    (".tar.xz", "tar.xz"),
+    (".tar.zst", "tar.zst"),
+    (".tgz", "tar.gz"),
+    (".tbz2", "tar.bz2"),
+    (".txz", "tar.xz"),
+    (".tzst", "tar.zst"),
+    (".tar", "tar"),
+    (".zip", "zip"),
+    (".gz", "gz"),
+    (".bz2", "bz2"),
+    (".xz", "xz"),
+    (".zst", "zst"),
+]
+
+DEFAULT_MAX_PENDING_CHUNKS = 8
+
+_EOF = None
+_LOCAL_HEADER = b"PK\x03\x04"
+_DATA_DESCRIPTOR = b"PK\x07\x08"
+# Streaming tarfile modes by compression; zstd is decompressed before tarfile sees it
+_TAR_MODES: dict[str, Literal["r|", "r|gz", "r|bz2", "r|xz"]] = {
+    "": "r|",
+    "zst": "r|",
+    "gz": "r|gz",
+    "bz2": "r|bz2",
+    "xz": "r|xz",
+}
+
+
+class _BinaryStream(Protocol):
+    """The parts of a readable binary file that tarfile, shutil and the decompressors use."""
+
+    def read(self, size: int = -1, /) -> bytes: ...
+
+    def write(self, data: bytes, /) -> object: ...
+
+    def tell(self) -> int: ...
+
+    def seek(self, offset: int, /) -> object: ...
+
+    def close(self) -> object: ...
+
+
+def archive_kind(filename: str) -> Optional[tuple[str, str]]:
+    """
+    Detect the archive format from a filename.
+    Returns (kind, stem) where stem is the filename without the archive suffix,
+    or None if the format is not supported.
+    """
+    lowered = filename.lower()
+    for suffix, kind in _ARCHIVE_SUFFIXES:
+        if lowered.endswith(suffix) and len(filename) > len(suffix):
+            return kind, filename[: -len(suffix)]
+    return None
+
+
+def _zstd_reader(source: _ChunkReader) -> _BinaryStream:
+    try:
+        import zstandard
+    except ImportError as exc:
+        raise RuntimeError(
+            "Zstandard support requires the 'zstandard' package (pip install alter[zstd])"
+        ) from exc
+    reader: _BinaryStream = zstandard.ZstdDecompressor().stream_reader(cast(IO[bytes], source))
+    return reader
+
+
+def _safe_target(root: Path, name: str) -> Path:
+    target = (root / name).resolve()
+    if target != root and root not in target.parents:
+        raise ValueError(f"Refusing to extract outside of target directory: {name}")
+    return target
+
+
+class _ChunkReader(io.RawIOBase):
+    """Blocking, read-only file object fed with chunks from the event loop through a queue."""
+
+    def __init__(
+        self, chunks: "queue.Queue[Optional[bytes]]", on_consumed: Callable[[], object]
+    ) -> None:
+        super().__init__()
+        self._chunks = chunks
+        self._on_consumed = on_consumed
+        self._buffer = memoryview(b"")
+        self._eof = False
+        self.aborted = False
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1, /) -> bytes:
+        # Reads block until data arrives, so unlike RawIOBase.read this never returns None
+        data = super().read(size)
+        assert data is not None
+        return data
+
+    def readinto(self, target: Any) -> int:
+        if not self._buffer:
+            if self._eof:
+                return 0
+            chunk = self._chunks.get()
+            self._on_consumed()
+            if self.aborted:
+                raise OSError("Extraction aborted")
+            if chunk is _EOF:
+                self._eof = True
+                return 0
+            self._buffer = memoryview(chunk)
+        size = min(len(target), len(self._buffer))
+        target[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+    def unread(self, data: bytes) -> None:
+        self._buffer = memoryview(bytes(data) + bytes(self._buffer))
+
+    def read_exact(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            piece = self.read(size - len(data))
+            if not piece:
+                raise EOFError("Archive ended unexpectedly")
+            data += piece
+        return bytes(data)
+
+    def drain(self) -> None:
+        while self.read(1024 * 1024):
+            pass
+
+
+def _extract_zip(reader: _ChunkReader, destination: Path) -> None:
+    """
+    Extract a zip archive front to back using its local file headers.
+    The central directory is never needed, so entries are written as soon as their bytes arrive.
+    """
+    while True:
+        signature = reader.read(4)
+        if signature and len(signature) < 4:
+            signature += reader.read_exact(4 - len(signature))
+        if signature != _LOCAL_HEADER:
+            # Central directory (or end of archive) reached
+            return
+        (_, flags, method, _, _, crc, compressed, size, name_len, extra_len) = struct.unpack(
+            "<HHHHHIIIHH", reader.read_exact(26)
+        )
+        name = reader.read_exact(name_len).decode("utf-8" if flags & 0x800 else "cp437")
+        extra = reader.read_exact(extra_len)
+        if flags & 0x1:
+            raise ValueError(f"Encrypted zip entries are not supported: {name}")
+        zip64_values = _zip64_extra(extra)
+        zip64 = zip64_values is not None
+        if zip64_values:
+            if size == 0xFFFFFFFF:
+                size = zip64_values.pop(0)
+            if compressed == 0xFFFFFFFF and zip64_values:
+                compressed = zip64_values.pop(0)
+        has_descriptor = bool(flags & 0x8)
+        if method == 0 and has_descriptor:
+            raise ValueError(f"Stored zip entries without sizes cannot be streamed: {name}")
+        if method not in (0, 8):
+            raise ValueError(f"Unsupported zip compression method {method}: {name}")
+
+        target = _safe_target(destination, name)
+        if name.endswith("/"):
+            target.mkdir(parents=True, exist_ok=True)
+            handle: Optional[IO[bytes]] = None
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            handle = open(target, "wb")
+        try:
+            checksum = _copy_zip_entry(reader, handle, method, compressed, has_descriptor)
+        finally:
+            if handle:
+                handle.close()
+
+        if has_descriptor:
+            descriptor = reader.read_exact(4)
+            if descriptor == _DATA_DESCRIPTOR:
+                descriptor = reader.read_exact(4)
+            crc = struct.unpack("<I", descriptor)[0]
+            reader.read_exact(16 if zip64 else 8)
+        if checksum != crc:
+            raise ValueError(f"CRC mismatch in zip entry: {name}")
+
+
+def _zip64_extra(extra: bytes) -> Optional[list[int]]:
+    """Return the values of the Zip64 extended information field, if present."""
+    offset = 0
+    while offset + 4 <= len(extra):
+        header_id, length = struct.unpack_from("<HH", extra, offset)
+        if header_id == 0x0001:
+            field = extra[offset + 4 : offset + 4 + length]
+            return list(struct.unpack_from(f"<{len(field) // 8}Q", field))
+        offset += 4 + length
+    return None
+
+
+def _copy_zip_entry(
+    reader: _ChunkReader,
+    handle: Optional[IO[bytes]],
+    method: int,
+    compressed: int,
+    has_descriptor: bool,
+) -> int:
+    checksum = 0
+    remaining = None if has_descriptor else compressed
+    decompressor = zlib.decompressobj(-15) if method == 8 else None
+    while remaining is None or remaining > 0:
+        piece = reader.read(1024 * 1024 if remaining is None else min(remaining, 1024 * 1024))
+        if not piece:
+            raise EOFError("Archive ended unexpectedly")
+        if remaining is not None:
+            remaining -= len(piece)
+        data = decompressor.decompress(piece) if decompressor else piece
+        checksum = zlib.crc32(data, checksum)
+        if handle:
+            handle.write(data)
+        if decompressor and decompressor.eof:
+            # Deflate is self-terminating; hand back whatever belongs to the next record
+            reader.unread(decompressor.unused_data)
+            if remaining:
+                reader.read_exact(remaining)
+            break
+    return checksum
+
+
+def extract_stream(source: _ChunkReader, destination: Path, kind: str, stem: str) -> None:
+    destination.mkdir(parents=True, exist_ok=True)
+    destination = destination.resolve()
+    if kind == "zip":
+        _extract_zip(source, destination)
+        return
+
+    compression = kind.partition(".")[2] if kind.startswith("tar") else kind
+    stream: _BinaryStream = source
+    if compression == "zst":
+        stream = _zstd_reader(source)
+    elif not kind.startswith("tar"):
+        openers: dict[str, Callable[[_ChunkReader], _BinaryStream]] = {
+            "gz": lambda raw: gzip.GzipFile(fileobj=raw),
+            "bz2": bz2.BZ2File,
+            # LZMAFile is typed to take IO[bytes] specifically, though any readable file works
+            "xz": lambda raw: lzma.LZMAFile(cast(IO[bytes], raw)),
+        }
+        stream = openers[compression](source)
+
+    if not kind.startswith("tar"):
+        with open(_safe_target(destination, stem), "wb") as handle:
+            shutil.copyfileobj(stream, handle, 1024 * 1024)
+        return
+
+    with tarfile.open(fileobj=stream, mode=_TAR_MODES[compression]) as archive:
+        if hasattr(tarfile, "data_filter"):
+            archive.extractall(destination, filter="data")
+        else:
+            for member in archive:
+                _safe_target(destination, member.name)
+                archive.extract(member, destination)
+
+
+class StreamExtractor:
+    """
+    Unpacks an archive while it downloads.
+    Chunks are handed over with feed() and decompressed/extracted on a worker thread, so CPU-heavy
+    work stays off the event loop; a small bounded queue applies backpressure to the download.
+    The thread is the extractor's own: it blocks on the queue for the whole download, and in the
+    loop's default executor it would starve the file writes and decoding that feed it.
+    """
+
+    def __init__(
+        self,
+        destination: Path,
+        filename: str,
+        max_pending: int = DEFAULT_MAX_PENDING_CHUNKS,
+    ) -> None:
+        detected = archive_kind(filename)
+        if detected is None:
+            raise ValueError(f"Cannot extract {filename}: unsupported archive type")
+        self.kind, stem = detected
+        loop = asyncio.get_running_loop()
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue(maxsize=max(1, max_pending))
+        self._space = asyncio.Event()
+        self._reader = _ChunkReader(
+            self._chunks, lambda: loop.call_soon_threadsafe(self._space.set)
+        )
+        self._worker: "asyncio.Future[None]" = loop.create_future()
+        self._worker.add_done_callback(lambda _: self._space.set())
+        threading.Thread(
+            target=self._run,
+            args=(loop, destination, self.kind, stem),
+            name=f"alter-extract-{filename}",
+            daemon=True,
+        ).start()
+
+    def _run(
+        self, loop: asyncio.AbstractEventLoop, destination: Path, kind: str, stem: str
+    ) -> None:
+        error: Optional[BaseException] = None
+        try:
+            self._extract(destination, kind, stem)
+        except BaseException as exc:
+            error = exc
+        # The loop may already be gone if the program is shutting down
+        with contextlib.suppress(RuntimeError):
+            loop.call_soon_threadsafe(self._settle, error)
+
+    def _settle(self, error: Optional[BaseException]) -> None:
+        if self._worker.done():
+            return
+        if error is None:
+            self._worker.set_result(None)
+        else:
+            self._worker.set_exception(error)
+
+    def _extract(self, destination: Path, kind: str, stem: str) -> None:
+        extract_stream(self._reader, destination, kind, stem)
+        # Trailing padding (tar records, zip central directory) is not needed
+        self._reader.drain()
+
+    async def feed(self, chunk: bytes) -> None:
+        await self._put(chunk)
+
+    async def _put(self, item: Optional[bytes]) -> None:
+        while True:
+            if self._worker.done():
+                await self._worker
+                raise RuntimeError("Archive extraction stopped before the download finished")
+            try:
+                self._chunks.put_nowait(item)
+                return
+            except queue.Full:
+                self._space.clear()
+                if self._chunks.full() and not self._worker.done():
+                    await self._space.wait()
+
+    async def finish(self) -> None:
+        """Signal the end of the stream and wait for extraction to complete."""
+        await self._put(_EOF)
+        await self._worker
+
+    async def abort(self) -> None:
+        self._reader.aborted = True
+        with contextlib.suppress(queue.Full):
+            self._chunks.put_nowait(_EOF)
+        with contextlib.suppress(Exception):
+            await self._worker
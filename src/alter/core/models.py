@@ -2,13 +2,23 @@ from __future__ import annotations
 
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from alter.core.ranges import ByteRangeSpec
 
 
 @dataclass(frozen=True)
 class DownloadRequest:
     url: str
     output: Optional[Path] = None
+    directory: Optional[Path] = None
+    # Unpack the archive into this directory while downloading instead of saving it
+    extract_to: Optional[Path] = None
+    # Expected SHA-256 of the content; verified after download and usable as a cache key
+    sha256: Optional[str] = None
+    # Fetch only these ranges ("0-99", "1000-", "-65536") into a sparse output file
+    byte_ranges: Optional[tuple[ByteRangeSpec, ...]] = None
 
 
 @dataclass
@@ -20,3 +30,22 @@ class DownloadProgress:
     status: str
     name: str
     error: Optional[str] = None
+    # Set for content-encoded transfers, where downloaded/total count decoded bytes
+    wire_downloaded: Optional[int] = None
+    wire_total: Optional[int] = None
+
+
+@dataclass(frozen=True)
+class DownloadResult:
+    task_id: str
+    url: str
+    output: Path
+    status: str
+    downloaded: int
+    total: Optional[int]
+    elapsed: float
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "completed"
@@ -0,0 +1,274 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, AsyncIterable, AsyncIterator, Optional, TypeVar
+
+
+DEFAULT_LAG_INTERVAL = 0.05
+# Trace events kept in memory; later spans are still counted in the report
+MAX_TRACE_EVENTS = 1_000_000
+
+T = TypeVar("T")
+
+
+class _StageStats:
+    __slots__ = ("calls", "wall", "cpu", "longest")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.longest = 0.0
+
+
+class _Span:
+    __slots__ = ("_profiler", "_stage", "_task_id", "_sync", "_start", "_cpu_start")
+
+    def __init__(self, profiler: "Profiler", stage: str, task_id: str, sync: bool) -> None:
+        self._profiler = profiler
+        self._stage = stage
+        self._task_id = task_id
+        self._sync = sync
+
+    def __enter__(self) -> None:
+        self._profiler._watch_loop()
+        self._cpu_start = time.thread_time() if self._sync else 0.0
+        self._start = time.perf_counter()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        end = time.perf_counter()
+        cpu = time.thread_time() - self._cpu_start if self._sync else 0.0
+        self._profiler._record(self._stage, self._task_id, self._start, end, cpu)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: Any) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Profiler:
+    """
+    Collects per-task, per-stage timings and event-loop lag for --profile.
+    Spans only add two clock reads and a dict update, so instrumentation stays on the hot path.
+    Only spans marked sync (no awaits inside) are charged CPU time, since an awaiting span
+    would also be billed for every other coroutine the loop ran meanwhile.
+    """
+
+    def __init__(self, trace: bool = False, lag_interval: float = DEFAULT_LAG_INTERVAL) -> None:
+        self._origin = time.perf_counter()
+        self._cpu_origin = time.process_time()
+        self._stages: dict[tuple[str, str], _StageStats] = {}
+        self._spans: dict[str, list[float]] = {}
+        self._names: dict[str, str] = {}
+        self._events: Optional[list[dict[str, Any]]] = [] if trace else None
+        self._dropped = 0
+        self._threads: dict[str, int] = {}
+        self._lag_interval = lag_interval
+        self._lags: list[float] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_cpu: Optional[list[float]] = None
+
+    def span(self, stage: str, task_id: str = "", sync: bool = False) -> _Span:
+        return _Span(self, stage, task_id, sync)
+
+    def describe(self, task_id: str, name: str) -> None:
+        self._names[task_id] = name
+
+    def _record(self, stage: str, task_id: str, start: float, end: float, cpu: float) -> None:
+        stats = self._stages.get((task_id, stage))
+        if stats is None:
+            stats = self._stages[(task_id, stage)] = _StageStats()
+        duration = end - start
+        stats.calls += 1
+        stats.wall += duration
+        stats.cpu += cpu
+        stats.longest = max(stats.longest, duration)
+        bounds = self._spans.get(task_id)
+        if bounds is None:
+            self._spans[task_id] = [start, end]
+        else:
+            bounds[0] = min(bounds[0], start)
+            bounds[1] = max(bounds[1], end)
+        if self._events is not None:
+            self._trace(
+                {
+                    "name": stage,
+                    "ph": "X",
+                    "ts": (start - self._origin) * 1e6,
+                    "dur": duration * 1e6,
+                    "tid": self._thread(task_id),
+                }
+            )
+
+    def _thread(self, task_id: str) -> int:
+        tid = self._threads.get(task_id)
+        if tid is None:
+            tid = self._threads[task_id] = len(self._threads) + 1
+        return tid
+
+    def _trace(self, event: dict[str, Any]) -> None:
+        assert self._events is not None
+        if len(self._events) >= MAX_TRACE_EVENTS:
+            self._dropped += 1
+            return
+        self._events.append(event)
+
+    def _watch_loop(self) -> None:
+        # Sampling starts lazily from inside whichever loop runs the downloads; a chain of
+        # call_later handles (rather than a task) simply stops when that loop is closed.
+        if self._loop is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._loop = loop
+        self._loop_cpu = [time.thread_time(), time.thread_time()]
+        self._schedule_sample(loop)
+
+    def _schedule_sample(self, loop: asyncio.AbstractEventLoop) -> None:
+        expected = loop.time() + self._lag_interval
+        loop.call_later(self._lag_interval, self._sample, loop, expected)
+
+    def _sample(self, loop: asyncio.AbstractEventLoop, expected: float) -> None:
+        lag = max(0.0, loop.time() - expected)
+        self._lags.append(lag)
+        assert self._loop_cpu is not None
+        self._loop_cpu[1] = time.thread_time()
+        if self._events is not None:
+            self._trace(
+                {
+                    "name": "event loop lag",
+                    "ph": "C",
+                    "ts": (time.perf_counter() - self._origin) * 1e6,
+                    "args": {"ms": lag * 1000},
+                }
+            )
+        self._schedule_sample(loop)
+
+    def report(self) -> str:
+        wall = time.perf_counter() - self._origin
+        cpu = time.process_time() - self._cpu_origin
+        lines = [f"Alter profile: {wall:.3f} s wall, {cpu:.3f} s CPU"]
+        if self._loop_cpu is not None:
+            loop_cpu = self._loop_cpu[1] - self._loop_cpu[0]
+            lines.append(
+                f"  event loop thread {loop_cpu:.3f} s CPU, "
+                f"worker threads ~{max(0.0, cpu - loop_cpu):.3f} s CPU"
+            )
+        if self._lags:
+            ordered = sorted(self._lags)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            mean = sum(ordered) / len(ordered)
+            lines.append(
+                f"Event loop lag: {len(ordered)} samples, mean {mean * 1000:.2f} ms, "
+                f"p99 {p99 * 1000:.2f} ms, max {ordered[-1] * 1000:.2f} ms"
+            )
+        for task_id, (start, end) in sorted(self._spans.items(), key=lambda item: item[1][0]):
+            span = end - start
+            label = self._names.get(task_id, "")
+            lines.append("")
+            lines.append(f"{task_id or 'app'}{f' ({label})' if label else ''}: {span:.3f} s")
+            lines.append(
+                f"  {'stage':<10} {'calls':>8} {'wall s':>10} {'share':>7} "
+                f"{'max ms':>9} {'cpu s':>8}"
+            )
+            stages = [
+                (stage, stats) for (owner, stage), stats in self._stages.items() if owner == task_id
+            ]
+            for stage, stats in sorted(stages, key=lambda item: -item[1].wall):
+                # Stages overlap (parts run concurrently), so shares can add up past 100%
+                share = stats.wall / span * 100 if span > 0 else 0.0
+                cpu_text = f"{stats.cpu:.3f}" if stats.cpu else "-"
+                lines.append(
+                    f"  {stage:<10} {stats.calls:>8} {stats.wall:>10.3f} {share:>6.1f}% "
+                    f"{stats.longest * 1000:>9.2f} {cpu_text:>8}"
+                )
+        if self._dropped:
+            lines.append("")
+            lines.append(
+                f"Trace truncated: {self._dropped} events beyond {MAX_TRACE_EVENTS} "
+                "were not recorded"
+            )
+        return "\n".join(lines) + "\n"
+
+    def write_trace(self, path: Path) -> None:
+        """Write a Chrome trace (chrome://tracing, Perfetto and speedscope can all open it)."""
+        pid = os.getpid()
+        events = [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": pid,
+                "tid": tid,
+                "args": {"name": self._names.get(task_id, task_id) or "app"},
+            }
+            for task_id, tid in self._threads.items()
+        ]
+        for event in self._events or []:
+            events.append({**event, "pid": pid, "tid": event.get("tid", 0)})
+        path.write_text(json.dumps({"traceEvents": events, "displayTimeUnit": "ms"}))
+
+
+_active: Optional[Profiler] = None
+
+
+def enable(profiler: Profiler) -> None:
+    global _active
+    _active = profiler
+
+
+def disable() -> Optional[Profiler]:
+    global _active
+    profiler, _active = _active, None
+    return profiler
+
+
+def active() -> Optional[Profiler]:
+    return _active
+
+
+def span(stage: str, task_id: str = "", sync: bool = False) -> Any:
+    """Time a stage if profiling is enabled; a shared no-op otherwise."""
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(stage, task_id, sync)
+
+
+def describe(task_id: str, name: str) -> None:
+    if _active is not None:
+        _active.describe(task_id, name)
+
+
+def timed(iterable: AsyncIterable[T], stage: str, task_id: str = "") -> AsyncIterable[T]:
+    """Time each step of an async iterator (e.g. network reads) as a stage."""
+    profiler = _active
+    if profiler is None:
+        return iterable
+    return _timed(profiler, iterable, stage, task_id)
+
+
+async def _timed(
+    profiler: Profiler, iterable: AsyncIterable[T], stage: str, task_id: str
+) -> AsyncIterator[T]:
+    iterator = iterable.__aiter__()
+    while True:
+        with profiler.span(stage, task_id):
+            try:
+                item = await iterator.__anext__()
+            except StopAsyncIteration:
+                return
+        yield item
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import re
+from typing import Awaitable, Callable, Iterable, Optional, Sequence, Union
+
+import aiohttp
+
+
+# (start, end) as written in a Range header:
+# (None, n) is a suffix of n bytes, (n, None) is open-ended
+ByteRange = tuple[Optional[int], Optional[int]]
+ByteRangeSpec = Union[str, ByteRange]
+
+DEFAULT_RANGE_GAP = 64 * 1024
+
+_CONTENT_RANGE = re.compile(r"bytes\s+(\d+)-(\d+)/(\d+|\*)", re.IGNORECASE)
+
+
+def parse_byte_range(spec: ByteRangeSpec) -> ByteRange:
+    """Parse "0-99", "100-" or "-65536" (or an equivalent tuple) into a ByteRange."""
+    if isinstance(spec, tuple):
+        start, end = spec
+    else:
+        text = spec.strip()
+        if text.lower().startswith("bytes="):
+            text = text[6:]
+        first, sep, last = text.partition("-")
+        if not sep:
+            raise ValueError(f"Invalid byte range: {spec!r}")
+        try:
+            start = int(first) if first.strip() else None
+            end = int(last) if last.strip() else None
+        except ValueError:
+            raise ValueError(f"Invalid byte range: {spec!r}") from None
+    if start is None and end is None:
+        raise ValueError(f"Invalid byte range: {spec!r}")
+    if (start is not None and start < 0) or (end is not None and end < 0):
+        raise ValueError(f"Invalid byte range: {spec!r}")
+    if start is not None and end is not None and end < start:
+        raise ValueError(f"Invalid byte range: {spec!r}")
+    if start is None and end == 0:
+        raise ValueError(f"Invalid byte range: {spec!r}")
+    return start, end
+
+
+def format_byte_range(byte_range: ByteRange) -> str:
+    start, end = byte_range
+    return f"{'' if start is None else start}-{'' if end is None else end}"
+
+
+def resolve_ranges(specs: Iterable[ByteRangeSpec], total: int) -> list[tuple[int, int]]:
+    """Turn range specs into absolute inclusive (start, end) pairs clipped to the file size."""
+    resolved: list[tuple[int, int]] = []
+    for spec in specs:
+        start, end = parse_byte_range(spec)
+        if start is None:
+            assert end is not None
+            start, end = max(0, total - end), total - 1
+        elif end is None or end >= total:
+            end = total - 1
+        if start >= total:
+            raise ValueError(
+                f"Byte range {format_byte_range((start, end))} "
+                f"is beyond the end of the file ({total} bytes)"
+            )
+        resolved.append((start, end))
+    return resolved
+
+
+def coalesce_ranges(
+    ranges: Iterable[tuple[int, int]], gap: int = DEFAULT_RANGE_GAP
+) -> list[tuple[int, int]]:
+    """Merge overlapping ranges and ranges separated by at most `gap` bytes."""
+    merged: list[tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1 + gap:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def parse_content_range(value: str) -> tuple[int, int, Optional[int]]:
+    match = _CONTENT_RANGE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid Content-Range: {value!r}")
+    total = match.group(3)
+    return int(match.group(1)), int(match.group(2)), None if total == "*" else int(total)
+
+
+def _split_groups(ranges: list[tuple[int, int]], count: int) -> list[list[tuple[int, int]]]:
+    count = max(1, min(count, len(ranges)))
+    size, extra = divmod(len(ranges), count)
+    groups = []
+    index = 0
+    for group in range(count):
+        length = size + (1 if group < extra else 0)
+        groups.append(ranges[index : index + length])
+        index += length
+    return groups
+
+
+def _uncovered(
+    ranges: Iterable[tuple[int, int]], covered: Iterable[tuple[int, int]]
+) -> list[tuple[int, int]]:
+    """The parts of `ranges` that no (start, end) pair in `covered` overlaps."""
+    received = coalesce_ranges(covered, gap=0)
+    missing: list[tuple[int, int]] = []
+    for start, end in ranges:
+        position = start
+        for first, last in received:
+            if last < position or first > end:
+                continue
+            if first > position:
+                missing.append((position, first - 1))
+            position = last + 1
+            if position > end:
+                break
+        if position <= end:
+            missing.append((position, end))
+    return missing
+
+
+DataCallback = Callable[[int, bytes], Union[None, Awaitable[None]]]
+
+
+async def discover_size(session: aiohttp.ClientSession, url: str) -> int:
+    """Learn the size of a resource from a one-byte range request."""
+    async with session.get(url, headers={"Range": "bytes=0-0"}) as response:
+        if response.status != 206:
+            raise ValueError("Server does not support range requests")
+        _, _, total = parse_content_range(response.headers.get("Content-Range", ""))
+        if total is None:
+            raise ValueError("Server did not report the resource size")
+        return total
+
+
+async def fetch_ranges(
+    session: aiohttp.ClientSession,
+    url: str,
+    ranges: Sequence[tuple[int, int]],
+    on_data: DataCallback,
+    connections: int,
+    chunk_size: int,
+) -> None:
+    """
+    Fetch absolute byte ranges, calling on_data(offset, chunk) for every piece received.
+    Ranges are spread over up to `connections` requests; each request asks for several ranges
+    at once and the multipart/byteranges reply is split by part. Servers that answer a
+    multi-range request with the whole file, or with only some of the ranges, are retried one
+    range per request; a range that still does not arrive is an error.
+    """
+
+    async def deliver(offset: int, chunk: bytes) -> None:
+        result = on_data(offset, chunk)
+        if inspect.isawaitable(result):
+            await result
+
+    async def read_body(content: aiohttp.StreamReader, offset: int, expected: int) -> None:
+        received = 0
+        async for chunk in content.iter_chunked(chunk_size):
+            if received + len(chunk) > expected:
+                chunk = chunk[: expected - received]
+            await deliver(offset + received, chunk)
+            received += len(chunk)
+            if received >= expected:
+                break
+        if received != expected:
+            raise IOError(f"Range at {offset} ended after {received} of {expected} bytes")
+
+    async def fetch_group(group: list[tuple[int, int]]) -> None:
+        # None means the whole file came back instead, so every range is asked for on its own
+        missing = _uncovered(group, await fetch_once(group) or [])
+        if not missing:
+            return
+        if len(group) == 1:
+            start, end = missing[0]
+            raise IOError(f"Server did not return bytes {start}-{end}")
+        for single in missing:
+            await fetch_group([single])
+
+    async def fetch_once(group: list[tuple[int, int]]) -> Optional[list[tuple[int, int]]]:
+        """Request the group's ranges at once; returns the ranges the reply actually held."""
+        header = "bytes=" + ",".join(f"{start}-{end}" for start, end in group)
+        covered: list[tuple[int, int]] = []
+        async with session.get(url, headers={"Range": header}) as response:
+            if response.status == 200 and len(group) > 1:
+                response.close()
+                return None
+            if response.status != 206:
+                raise aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message="Range request failed",
+                )
+            if response.content_type == "multipart/byteranges":
+                reader = aiohttp.MultipartReader.from_response(response)
+                while True:
+                    part = await reader.next()
+                    if part is None:
+                        break
+                    if not isinstance(part, aiohttp.BodyPartReader):
+                        raise IOError("Unexpected nested multipart in a byte-range response")
+                    start, end, _ = parse_content_range(part.headers.get("Content-Range", ""))
+                    offset = start
+                    while True:
+                        chunk = await part.read_chunk(chunk_size)
+                        if not chunk:
+                            break
+                        await deliver(offset, chunk)
+                        offset += len(chunk)
+                    if offset != end + 1:
+                        raise IOError(f"Range {start}-{end} ended after {offset - start} bytes")
+                    covered.append((start, end))
+                return covered
+            content_range = response.headers.get("Content-Range")
+            start, end, _ = (
+                parse_content_range(content_range)
+                if content_range
+                else (group[0][0], group[-1][1], None)
+            )
+            await read_body(response.content, start, end - start + 1)
+            covered.append((start, end))
+        return covered
+
+    await asyncio.gather(
+        *(fetch_group(group) for group in _split_groups(list(ranges), connections))
+    )
@@ -0,0 +1,261 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import functools
+import itertools
+import uuid
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+from alter.core.downloader import resolve_output
+from alter.core.models import DownloadProgress, DownloadRequest
+from alter.core.rpc import (
+    DEFAULT_SOCKET_PATH,
+    STREAM_LIMIT,
+    RPCError,
+    decode_message,
+    make_request,
+    progress_from_dict,
+    request_to_dict,
+)
+
+
+class RemoteTask:
+    """Client-side mirror of a task hosted by the daemon, kept current by progress notifications."""
+
+    __slots__ = (
+        "id",
+        "url",
+        "output",
+        "name",
+        "total",
+        "downloaded",
+        "wire_downloaded",
+        "wire_total",
+        "speed_bps",
+        "status",
+        "error",
+    )
+
+    def __init__(self, task_id: str, url: str, output: Path) -> None:
+        self.id = task_id
+        self.url = url
+        self.output = output
+        self.name = output.name
+        self.total: Optional[int] = None
+        self.downloaded = 0
+        self.wire_downloaded: Optional[int] = None
+        self.wire_total: Optional[int] = None
+        self.speed_bps = 0.0
+        self.status = "queued"
+        self.error: Optional[str] = None
+
+    def apply(self, snapshot: dict[str, Any]) -> DownloadProgress:
+        progress = progress_from_dict(snapshot)
+        self.name = progress.name
+        self.total = progress.total
+        self.downloaded = progress.downloaded
+        self.wire_downloaded = progress.wire_downloaded
+        self.wire_total = progress.wire_total
+        self.speed_bps = progress.speed_bps
+        self.status = progress.status
+        self.error = progress.error
+        if snapshot.get("output"):
+            self.output = Path(snapshot["output"])
+        return progress
+
+    def progress(self) -> DownloadProgress:
+        return DownloadProgress(
+            task_id=self.id,
+            downloaded=self.downloaded,
+            total=self.total,
+            speed_bps=self.speed_bps,
+            status=self.status,
+            name=self.name,
+            error=self.error,
+            wire_downloaded=self.wire_downloaded,
+            wire_total=self.wire_total,
+        )
+
+
+class RemoteManager:
+    """
+    Thin client for a running `alter daemon`.
+    Mirrors the DownloadManager interface so the TUI and scripts can drive the shared engine;
+    call connect() from inside the event loop before using it.
+    """
+
+    def __init__(
+        self,
+        socket_path: Optional[Path] = None,
+        progress_callback: Optional[Callable[[DownloadProgress], None]] = None,
+    ) -> None:
+        self.socket_path = socket_path or DEFAULT_SOCKET_PATH
+        self._progress_callback = progress_callback
+        self._tasks: dict[str, RemoteTask] = {}
+        self._removed: set[str] = set()
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._listener: Optional[asyncio.Task[None]] = None
+        self._pending: dict[int, asyncio.Future[Any]] = {}
+        self._ids = itertools.count(1)
+
+    async def connect(self) -> None:
+        try:
+            self._reader, self._writer = await asyncio.open_unix_connection(
+                str(self.socket_path), limit=STREAM_LIMIT
+            )
+        except OSError as exc:
+            raise ConnectionError(f"No Alter daemon listening on {self.socket_path}") from exc
+        self._listener = asyncio.create_task(self._listen())
+        for snapshot in await self.call("subscribe"):
+            self._apply(snapshot)
+
+    async def close(self) -> None:
+        # Requests still in flight are abandoned, not reported as failed tasks
+        for future in self._pending.values():
+            future.cancel()
+        self._pending.clear()
+        if self._writer:
+            self._writer.close()
+            with contextlib.suppress(ConnectionError):
+                await self._writer.wait_closed()
+        if self._listener:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+
+    async def __aenter__(self) -> "RemoteManager":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info: object) -> None:
+        await self.close()
+
+    async def call(self, method: str, **params: Any) -> Any:
+        """Send a request and wait for the daemon's result."""
+        future = self._request(method, params)
+        await self._require_writer().drain()
+        return await future
+
+    def _request(self, method: str, params: dict[str, Any]) -> asyncio.Future[Any]:
+        # Written synchronously, so requests reach the daemon in the order they were made
+        writer = self._require_writer()
+        request_id = next(self._ids)
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        writer.write(make_request(method, params, request_id))
+        return future
+
+    def _mutate(self, method: str, task_id: str, **params: Any) -> None:
+        # The resulting state arrives through the progress feed; only a failure needs handling.
+        future = self._request(method, {"task_id": task_id, **params})
+        future.add_done_callback(functools.partial(self._report_failure, task_id))
+
+    def _report_failure(self, task_id: str, future: asyncio.Future[Any]) -> None:
+        if future.cancelled():
+            return
+        exc = future.exception()
+        task = self._tasks.get(task_id)
+        if exc is None or task is None:
+            return
+        task.status = "error"
+        task.error = exc.message if isinstance(exc, RPCError) else str(exc)
+        if self._progress_callback:
+            self._progress_callback(task.progress())
+
+    def _require_writer(self) -> asyncio.StreamWriter:
+        if not self._writer or self._writer.is_closing():
+            raise ConnectionError("RemoteManager is not connected")
+        return self._writer
+
+    async def _listen(self) -> None:
+        assert self._reader is not None
+        try:
+            while True:
+                line = await self._reader.readline()
+                if not line:
+                    break
+                try:
+                    message = decode_message(line)
+                except RPCError:
+                    continue
+                if message.get("method") == "progress":
+                    params = message.get("params")
+                    if isinstance(params, dict):
+                        with contextlib.suppress(KeyError, TypeError, ValueError):
+                            self._apply(params)
+                    continue
+                request_id = message.get("id")
+                future = (
+                    self._pending.pop(request_id, None) if isinstance(request_id, int) else None
+                )
+                if not future or future.done():
+                    continue
+                if "error" in message:
+                    error = message["error"]
+                    if not isinstance(error, dict):
+                        error = {}
+                    future.set_exception(RPCError(error.get("code", 0), error.get("message", "")))
+                else:
+                    future.set_result(message.get("result"))
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Connection to daemon lost"))
+            self._pending.clear()
+
+    def _apply(self, snapshot: dict[str, Any]) -> None:
+        task_id = snapshot.get("task_id")
+        if not task_id or task_id in self._removed:
+            return
+        task = self._tasks.get(task_id)
+        if not task:
+            task = RemoteTask(task_id, snapshot.get("url", ""), Path(snapshot.get("output", "")))
+            self._tasks[task_id] = task
+        progress = task.apply(snapshot)
+        if self._progress_callback:
+            self._progress_callback(progress)
+
+    def add(self, request: DownloadRequest) -> RemoteTask:
+        # Relative paths are resolved here; the daemon does not share our working directory.
+        extract_to = request.extract_to.absolute() if request.extract_to else None
+        if request.output:
+            request = replace(request, output=request.output.absolute(), extract_to=extract_to)
+        else:
+            directory = (request.directory or Path.cwd()).absolute()
+            request = replace(request, directory=directory, extract_to=extract_to)
+        output, _ = resolve_output(request)
+        task = RemoteTask(uuid.uuid4().hex, request.url, output)
+        self._tasks[task.id] = task
+        self._mutate("add", task.id, start=False, **request_to_dict(request))
+        return task
+
+    def get(self, task_id: str) -> Optional[RemoteTask]:
+        return self._tasks.get(task_id)
+
+    def start(self, task_id: str) -> None:
+        if task_id in self._tasks:
+            self._mutate("start", task_id)
+
+    def pause(self, task_id: str) -> None:
+        if task_id in self._tasks:
+            self._mutate("pause", task_id)
+
+    def resume(self, task_id: str) -> None:
+        if task_id in self._tasks:
+            self._mutate("resume", task_id)
+
+    def stop(self, task_id: str) -> None:
+        if task_id in self._tasks:
+            self._mutate("stop", task_id)
+
+    def list(self) -> list[RemoteTask]:
+        return list(self._tasks.values())
+
+    def remove(self, task_id: str) -> None:
+        if self._tasks.pop(task_id, None):
+            self._removed.add(task_id)
+            self._mutate("remove", task_id)
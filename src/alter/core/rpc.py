@@ -0,0 +1,145 @@
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Optional
+
+from alter.core.models import DownloadProgress, DownloadRequest
+from alter.core.ranges import format_byte_range, parse_byte_range
+
+
+DEFAULT_SOCKET_PATH = Path.home() / ".alter" / "alter.sock"
+# Task lists for very large queues travel as a single line.
+STREAM_LIMIT = 64 * 1024 * 1024
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+TASK_NOT_FOUND = -32000
+
+# Task ids end up in staging file names, so only the uuid4().hex form clients generate is accepted
+TASK_ID_PATTERN = re.compile(r"[0-9a-f]{32}")
+
+
+class RPCError(Exception):
+    def __init__(self, code: int, message: str) -> None:
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def encode_message(payload: dict[str, Any]) -> bytes:
+    """Encode a JSON-RPC message as a single newline-terminated line."""
+    return json.dumps(payload, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_message(line: bytes) -> dict[str, Any]:
+    try:
+        payload = json.loads(line)
+    except ValueError as exc:
+        raise RPCError(PARSE_ERROR, f"Parse error: {exc}") from exc
+    if not isinstance(payload, dict):
+        raise RPCError(INVALID_REQUEST, "Invalid request")
+    return payload
+
+
+def make_request(method: str, params: dict[str, Any], request_id: Optional[int] = None) -> bytes:
+    payload: dict[str, Any] = {"jsonrpc": "2.0", "method": method, "params": params}
+    if request_id is not None:
+        payload["id"] = request_id
+    return encode_message(payload)
+
+
+def make_result(request_id: Any, result: Any) -> bytes:
+    return encode_message({"jsonrpc": "2.0", "id": request_id, "result": result})
+
+
+def make_error(request_id: Any, error: RPCError) -> bytes:
+    return encode_message(
+        {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "error": {"code": error.code, "message": error.message},
+        }
+    )
+
+
+def request_to_dict(request: DownloadRequest) -> dict[str, Any]:
+    return {
+        "url": request.url,
+        "output": str(request.output) if request.output else None,
+        "directory": str(request.directory) if request.directory else None,
+        "extract_to": str(request.extract_to) if request.extract_to else None,
+        "sha256": request.sha256,
+        "byte_ranges": (
+            [format_byte_range(parse_byte_range(spec)) for spec in request.byte_ranges]
+            if request.byte_ranges
+            else None
+        ),
+    }
+
+
+def _optional_str(data: dict[str, Any], key: str) -> Optional[str]:
+    value = data.get(key)
+    if value is not None and not isinstance(value, str):
+        raise RPCError(INVALID_PARAMS, f"{key} must be a string")
+    return value or None
+
+
+def _optional_path(data: dict[str, Any], key: str) -> Optional[Path]:
+    value = _optional_str(data, key)
+    return Path(value) if value else None
+
+
+def request_from_dict(data: dict[str, Any]) -> DownloadRequest:
+    url = data.get("url")
+    if not isinstance(url, str) or not url:
+        raise RPCError(INVALID_PARAMS, "url is required")
+    byte_ranges = data.get("byte_ranges")
+    if byte_ranges is not None and (
+        not isinstance(byte_ranges, list) or not all(isinstance(spec, str) for spec in byte_ranges)
+    ):
+        raise RPCError(INVALID_PARAMS, "byte_ranges must be a list of strings")
+    try:
+        for spec in byte_ranges or ():
+            parse_byte_range(spec)
+    except ValueError as exc:
+        raise RPCError(INVALID_PARAMS, str(exc)) from exc
+    return DownloadRequest(
+        url=url,
+        output=_optional_path(data, "output"),
+        directory=_optional_path(data, "directory"),
+        extract_to=_optional_path(data, "extract_to"),
+        sha256=_optional_str(data, "sha256"),
+        byte_ranges=tuple(byte_ranges) if byte_ranges else None,
+    )
+
+
+def task_id_from_dict(data: dict[str, Any]) -> Optional[str]:
+    task_id = data.get("task_id")
+    if task_id is None:
+        return None
+    if not isinstance(task_id, str) or not TASK_ID_PATTERN.fullmatch(task_id):
+        raise RPCError(INVALID_PARAMS, "task_id must be 32 lowercase hex digits")
+    return task_id
+
+
+def progress_to_dict(progress: DownloadProgress) -> dict[str, Any]:
+    return asdict(progress)
+
+
+def progress_from_dict(data: dict[str, Any]) -> DownloadProgress:
+    return DownloadProgress(
+        task_id=data["task_id"],
+        downloaded=data["downloaded"],
+        total=data.get("total"),
+        speed_bps=data.get("speed_bps", 0.0),
+        status=data["status"],
+        name=data["name"],
+        error=data.get("error"),
+        wire_downloaded=data.get("wire_downloaded"),
+        wire_total=data.get("wire_total"),
+    )
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+from typing import AsyncIterator, Optional
+
+import aiohttp
+
+from alter.core import profiling
+from alter.core.downloader import TaskConfig, probe_url, size_and_ranges
+
+
+DEFAULT_SEGMENT_SIZE = 4 * 1024 * 1024
+DEFAULT_BUFFER_BYTES = 64 * 1024 * 1024
+
+
+class _Segment:
+    """One ranged fetch; its chunks are handed to the consumer as they arrive."""
+
+    def __init__(self) -> None:
+        self.chunks: deque[bytes] = deque()
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+
+    def append(self, chunk: bytes) -> None:
+        self.chunks.append(chunk)
+        self._changed.set()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.done = True
+        self.error = error
+        self._changed.set()
+
+    async def drain(self) -> AsyncIterator[bytes]:
+        while True:
+            self._changed.clear()
+            while self.chunks:
+                yield self.chunks.popleft()
+            if self.error is not None:
+                raise self.error
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+async def stream_url(
+    session: aiohttp.ClientSession,
+    url: str,
+    config: TaskConfig,
+    segment_size: int = DEFAULT_SEGMENT_SIZE,
+    buffer_bytes: int = DEFAULT_BUFFER_BYTES,
+) -> AsyncIterator[bytes]:
+    """
+    Yield the body of `url` strictly in order while fetching it with parallel ranges.
+    Segments are claimed front to back and at most `buffer_bytes` worth may be in flight
+    ahead of the consumer, so memory stays bounded even when the consumer is slow.
+    """
+    headers = await probe_url(session, url)
+    total, supports_ranges = size_and_ranges(headers) if headers is not None else (None, False)
+    connections = max(1, config.max_connections)
+    if not supports_ranges or not total or connections <= 1 or total <= segment_size:
+        async with session.get(url) as response:
+            response.raise_for_status()
+            chunks = response.content.iter_chunked(config.chunk_size)
+            async for chunk in profiling.timed(chunks, "network", url):
+                if chunk:
+                    yield chunk
+        return
+
+    async for chunk in _ordered_ranges(
+        session, url, total, connections, segment_size, buffer_bytes, config.chunk_size
+    ):
+        yield chunk
+
+
+async def _ordered_ranges(
+    session: aiohttp.ClientSession,
+    url: str,
+    total: int,
+    connections: int,
+    segment_size: int,
+    buffer_bytes: int,
+    chunk_size: int,
+) -> AsyncIterator[bytes]:
+    bounds = [
+        (start, min(start + segment_size, total) - 1) for start in range(0, total, segment_size)
+    ]
+    window = max(connections, buffer_bytes // segment_size)
+    segments: dict[int, _Segment] = {}
+    state = {"claimed": 0, "emitted": 0}
+    changed = asyncio.Condition()
+
+    async def worker() -> None:
+        while True:
+            async with changed:
+                await changed.wait_for(
+                    lambda: state["claimed"] >= len(bounds)
+                    or state["claimed"] < state["emitted"] + window
+                )
+                if state["claimed"] >= len(bounds):
+                    return
+                index = state["claimed"]
+                state["claimed"] += 1
+                segment = segments[index] = _Segment()
+                changed.notify_all()
+            start, end = bounds[index]
+            try:
+                headers = {"Range": f"bytes={start}-{end}"}
+                async with session.get(url, headers=headers) as response:
+                    if response.status != 206:
+                        raise aiohttp.ClientResponseError(
+                            response.request_info,
+                            response.history,
+                            status=response.status,
+                            message="Range request failed",
+                        )
+                    received = 0
+                    chunks = response.content.iter_chunked(chunk_size)
+                    async for chunk in profiling.timed(chunks, "network", url):
+                        received += len(chunk)
+                        segment.append(chunk)
+                    if received != end - start + 1:
+                        raise IOError(f"Range {start}-{end} ended after {received} bytes")
+            except Exception as exc:
+                segment.finish(exc)
+                return
+            segment.finish()
+
+    workers = [asyncio.create_task(worker()) for _ in range(connections)]
+    try:
+        for index in range(len(bounds)):
+            async with changed:
+                await changed.wait_for(lambda: index in segments)
+            async for chunk in segments[index].drain():
+                yield chunk
+            async with changed:
+                del segments[index]
+                state["emitted"] += 1
+                changed.notify_all()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
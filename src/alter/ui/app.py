@@ -1,64 +1,113 @@
 from __future__ import annotations
 
-from typing import Iterable, Optional
+from pathlib import Path
+from typing import Iterable, Optional, Union
 
+from rich.console import Group
+from rich.progress_bar import ProgressBar as Bar
+from rich.table import Table
+from rich.text import Text
 from textual.app import App, ComposeResult
-from textual.containers import Container
-from textual.widgets import Footer, Header, Label, ListItem, ListView, ProgressBar, Static
+from textual.widgets import Footer, Header, ListItem, ListView, Static
 
+from alter.core import profiling
 from alter.core.downloader import DownloadManager, TaskConfig
 from alter.core.formatting import format_bytes
 from alter.core.models import DownloadProgress, DownloadRequest
+from alter.core.remote import RemoteManager
 from alter.ui.screens import AddDownloadScreen, RemoveDownloadScreen
 
 
 class DownloadRow(ListItem):
+    """
+    One download in the list.
+    Drawn by a single Static holding a Rich layout rather than a tree of label and progress
+    widgets, so long queues stay cheap to mount, style and lay out. The layout is built once;
+    progress updates only change its text and bar.
+    """
+
     def __init__(self, task_id: str, name: str, url: str) -> None:
         super().__init__()
         self.add_class("download-row")
         self.task_id = task_id
         self.display_name = name
         self.display_url = url
-        self._status_label: Optional[Label] = None
-        self._progress_label: Optional[Label] = None
-        self._speed_label: Optional[Label] = None
-        self._bar: Optional[ProgressBar] = None
+        self._body = Static(classes="row")
+        self._layout = _RowLayout(name)
 
     def compose(self) -> ComposeResult:
-        name = Label(self.display_name, classes="name")
-        status = Label("queued", classes="status")
-        bar = ProgressBar(total=100, show_eta=False, show_percentage=False, id="bar")
-        speed = Label("0 B/s", classes="speed")
-        progress = Label("0%", classes="progress")
+        self._body.update(self._layout.renderable)
+        yield self._body
 
-        self._status_label = status
-        self._progress_label = progress
-        self._speed_label = speed
-        self._bar = bar
+    def update_from_progress(self, progress: DownloadProgress) -> None:
+        status = progress.status
+        if progress.error:
+            status = f"error: {progress.error}"
+        if progress.total:
+            percent = (progress.downloaded / progress.total) * 100
+            details = f"{format_bytes(progress.downloaded)} / {format_bytes(progress.total)}"
+            summary = f"{percent:0.1f}% ({details})"
+            completed, total = percent, 100.0
+        elif progress.wire_total:
+            # Compressed transfer: the decoded size is unknown, so track the wire instead
+            wire = progress.wire_downloaded or 0
+            percent = (wire / progress.wire_total) * 100
+            details = f"{format_bytes(wire)} / {format_bytes(progress.wire_total)} wire"
+            summary = f"{percent:0.1f}% ({details}, {format_bytes(progress.downloaded)} decoded)"
+            completed, total = percent, 100.0
+        else:
+            summary = f"{format_bytes(progress.downloaded)}"
+            completed, total = 0, 1
+        speed = f"{format_bytes(int(progress.speed_bps))}/s"
+        self._layout.update(progress.name, status, completed, total, summary, speed)
+        # Rows have a fixed height, so a repaint is enough
+        self._body.update(self._layout.renderable, layout=False)
+
+
+class _RowLayout:
+    """The Rich layout of one row, whose parts are updated in place."""
+
+    def __init__(self, name: str) -> None:
+        self.name = Text(name, style="bold")
+        self.status = Text("queued")
+        self.bar = Bar(total=1, completed=0)
+        self.speed = Text("0 B/s", style="green")
+        self.summary = Text("0%", justify="center", style="dim")
+        grid = Table.grid(expand=True, padding=(0, 1))
+        grid.add_column(ratio=1)
+        grid.add_column(justify="right")
+        grid.add_row(self.name, self.status)
+        grid.add_row(self.bar, self.speed)
+        self.renderable = Group(grid, self.summary)
+
+    def update(
+        self, name: str, status: str, completed: float, total: float, summary: str, speed: str
+    ) -> None:
+        self.name.plain = name
+        self.status.plain = status
+        self.bar.update(completed, total)
+        self.speed.plain = speed
+        self.summary.plain = summary
+
+
+class QueueSummary(ListItem):
+    """
+    One line standing in for every queued download.
+    A queued task only gets its own row once it leaves the queue, so a queue of any length
+    costs two widgets rather than two per entry.
+    """
 
-        yield Container(name, status, bar, speed, progress, classes="row")
+    def __init__(self) -> None:
+        super().__init__(classes="queue-summary")
+        self._body = Static(classes="row")
+        self.display = False
 
-    def update_from_progress(self, progress: DownloadProgress) -> None:
-        if self._status_label:
-            status = progress.status
-            if progress.error:
-                status = f"error: {progress.error}"
-            self._status_label.update(status)
-        if self._progress_label:
-            if progress.total:
-                percent = (progress.downloaded / progress.total) * 100
-                details = f"{format_bytes(progress.downloaded)} / {format_bytes(progress.total)}"
-                self._progress_label.update(f"{percent:0.1f}% ({details})")
-                if self._bar:
-                    self._bar.total = 100
-                    self._bar.progress = percent
-            else:
-                self._progress_label.update(f"{format_bytes(progress.downloaded)}")
-                if self._bar:
-                    self._bar.total = 1
-                    self._bar.progress = 0
-        if self._speed_label:
-            self._speed_label.update(f"{format_bytes(int(progress.speed_bps))}/s")
+    def compose(self) -> ComposeResult:
+        yield self._body
+
+    def set_count(self, count: int) -> None:
+        self._body.update(Text(f"{count} queued", style="dim"), layout=False)
+        self.display = count > 0
 
 
 class DownloadApp(App):
@@ -75,39 +124,16 @@ class DownloadApp(App):
         height: 6;
     }
 
+    .queue-summary {
+        height: 3;
+    }
+
     .row {
-        layout: grid;
-        grid-size: 2 3;
-        grid-columns: 1fr auto;
-        grid-rows: auto auto auto;
         padding: 0 2;
         border: heavy $accent;
         margin: 0 2;
     }
 
-    .name {
-        text-style: bold;
-    }
-
-    .status {
-        text-align: right;
-    }
-
-    .speed {
-        text-align: right;
-        color: $success;
-    }
-
-    .progress {
-        column-span: 2;
-        text-align: center;
-        color: $text-muted;
-    }
-
-    #bar {
-        height: 1;
-    }
-
     #hint {
         padding: 0 2;
         color: $text-muted;
@@ -122,19 +148,41 @@ class DownloadApp(App):
         ("q", "quit", "Quit"),
     ]
 
-    def __init__(self, initial: Iterable[DownloadRequest], config: Optional[TaskConfig] = None) -> None:
+    def __init__(
+        self,
+        initial: Iterable[DownloadRequest],
+        config: Optional[TaskConfig] = None,
+        socket_path: Optional[Path] = None,
+    ) -> None:
         super().__init__()
-        self._manager = DownloadManager(config=config, progress_callback=self._handle_progress)
+        self._manager: Union[DownloadManager, RemoteManager]
+        if socket_path:
+            # Attach to the shared engine hosted by `alter daemon`
+            self._manager = RemoteManager(socket_path, progress_callback=self._handle_progress)
+        else:
+            self._manager = DownloadManager(config=config, progress_callback=self._handle_progress)
         self._rows: dict[str, DownloadRow] = {}
+        # Tasks counted by the queue summary instead of having a row of their own
+        self._queued: set[str] = set()
+        self._queue_summary = QueueSummary()
+        self._closing = False
         self._initial = list(initial)
 
     def compose(self) -> ComposeResult:
         yield Header()
-        yield ListView(id="downloads")
+        yield ListView(self._queue_summary, id="downloads")
         yield Static("A=Add  P=Pause/Resume  S=Stop  D=Remove  Q=Quit", id="hint")
         yield Footer()
 
-    def on_mount(self) -> None:
+    async def on_mount(self) -> None:
+        if isinstance(self._manager, RemoteManager):
+            try:
+                await self._manager.connect()
+            except ConnectionError as exc:
+                self.exit(message=str(exc))
+                return
+            for task in self._manager.list():
+                self._add_row(task.id, task.name, task.url, task.status)
         for request in self._initial:
             self._add_and_start(request)
 
@@ -142,20 +190,49 @@ class DownloadApp(App):
         self._update_row(progress)
 
     def _update_row(self, progress: DownloadProgress) -> None:
+        if self._closing:
+            return
+        if progress.task_id in self._queued and progress.status != "queued":
+            task = self._manager.get(progress.task_id)
+            self._set_queued(progress.task_id, False)
+            if task:
+                self._mount_row(task.id, task.name, task.url)
         row = self._rows.get(progress.task_id)
         if row:
-            row.update_from_progress(progress)
+            with profiling.span("render", progress.task_id, sync=True):
+                row.update_from_progress(progress)
 
     def _get_selected_row(self) -> Optional[DownloadRow]:
         list_view = self.query_one("#downloads", ListView)
         row = list_view.highlighted_child
         return row if isinstance(row, DownloadRow) else None
 
+    async def on_unmount(self) -> None:
+        # Stopping the downloads reports each one, and the rows are already gone
+        self._closing = True
+        await self._manager.close()
+
+    def _add_row(self, task_id: str, name: str, url: str, status: str = "queued") -> None:
+        if status == "queued":
+            self._set_queued(task_id, True)
+        else:
+            self._mount_row(task_id, name, url)
+
+    def _mount_row(self, task_id: str, name: str, url: str) -> None:
+        row = DownloadRow(task_id, name, url)
+        self._rows[task_id] = row
+        self.query_one("#downloads", ListView).mount(row, before=self._queue_summary)
+
+    def _set_queued(self, task_id: str, queued: bool) -> None:
+        if queued:
+            self._queued.add(task_id)
+        else:
+            self._queued.discard(task_id)
+        self._queue_summary.set_count(len(self._queued))
+
     def _add_and_start(self, request: DownloadRequest) -> None:
         task = self._manager.add(request)
-        row = DownloadRow(task.id, task.name, task.url)
-        self._rows[task.id] = row
-        self.query_one("#downloads", ListView).append(row)
+        self._add_row(task.id, task.name, task.url)
         self._manager.start(task.id)
 
     def action_add(self) -> None:
@@ -191,27 +268,28 @@ class DownloadApp(App):
             return
         self.push_screen(
             RemoveDownloadScreen(task.name, task.output),
-            lambda result: self._handle_remove_result(row.task_id, task.output, result)
+            lambda result: self._handle_remove_result(row.task_id, task.output, result),
         )
 
     def _handle_remove_result(self, task_id: str, file_path, remove_file: Optional[bool]) -> None:
         if remove_file is None:
             return  # User cancelled
-        
+
         # Stop and remove the task
         self._manager.stop(task_id)
         self._manager.remove(task_id)
-        
+
         # Remove the row from UI
         row = self._rows.get(task_id)
         if row:
             row.remove()
             self._rows.pop(task_id, None)
-        
+
         # Delete the file if requested
         if remove_file:
             try:
                 from pathlib import Path
+
                 path = Path(file_path)
                 if path.exists() and path.is_file():
                     path.unlink()
@@ -0,0 +1,103 @@
+import asyncio
+import gzip
+
+import pytest
+from aiohttp import MultipartWriter, web
+from aiohttp.test_utils import TestServer
+
+from helpers import PAYLOAD
+
+
+def _span(spec: str, size: int) -> tuple[int, int]:
+    first, _, last = spec.strip().partition("-")
+    if not first:
+        return max(0, size - int(last)), size - 1
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+def _multi_range_response(
+    body: bytes, spans: list[tuple[int, int]], headers: dict[str, str]
+) -> web.Response:
+    writer = MultipartWriter("byteranges")
+    for start, end in spans:
+        part = writer.append(body[start : end + 1], {"Content-Type": "application/octet-stream"})
+        part.headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+    return web.Response(status=206, body=writer, headers=headers)
+
+
+async def _slow_response(request: web.Request, response: web.Response) -> web.StreamResponse:
+    # Drips the body out over about a second so a test can act mid-download
+    assert isinstance(response.body, bytes)
+    body = response.body
+    stream = web.StreamResponse(status=response.status, headers=response.headers)
+    stream.content_length = len(body)
+    await stream.prepare(request)
+    step = max(1, len(body) // 20)
+    for start in range(0, len(body), step):
+        await stream.write(body[start : start + step])
+        await asyncio.sleep(0.05)
+    await stream.write_eof()
+    return stream
+
+
+@pytest.fixture
+async def server():
+    methods: list[str] = []
+    files: dict[str, bytes] = {}
+    extra_headers: dict[str, dict[str, str]] = {}
+    # Names served gzip-encoded to clients that accept it
+    compressed: set[str] = set()
+    accept_encodings: list[str] = []
+    # Names whose bodies are sent slowly
+    slow: set[str] = set()
+    # Names whose Range requests are answered incompletely: "first" serves only the first range
+    # requested, "drop-last" leaves out the last one, "short" cuts every range to one byte
+    range_modes: dict[str, str] = {}
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        response = await respond(request)
+        if request.match_info["name"] in slow and request.method == "GET":
+            return await _slow_response(request, response)
+        return response
+
+    async def respond(request: web.Request) -> web.Response:
+        methods.append(request.method)
+        body = files.get(request.match_info["name"], PAYLOAD)
+        headers = {"Accept-Ranges": "bytes", **extra_headers.get(request.match_info["name"], {})}
+        accept_encodings.append(request.headers.get("Accept-Encoding", ""))
+        if "Range" not in request.headers:
+            if request.match_info["name"] in compressed and "gzip" in request.headers.get(
+                "Accept-Encoding", ""
+            ):
+                headers["Content-Encoding"] = "gzip"
+                body = gzip.compress(body)
+            return web.Response(body=body, headers=headers)
+        spans = [
+            _span(spec, len(body)) for spec in request.headers["Range"].split("=", 1)[1].split(",")
+        ]
+        mode = range_modes.get(request.match_info["name"])
+        if mode == "first":
+            spans = spans[:1]
+        elif mode == "drop-last" and len(spans) > 1:
+            spans = spans[:-1]
+        elif mode == "short":
+            spans = [(start, start) for start, _ in spans]
+        if len(spans) > 1:
+            return _multi_range_response(body, spans, headers)
+        start, end = spans[0]
+        headers["Content-Range"] = f"bytes {start}-{end}/{len(body)}"
+        return web.Response(status=206, body=body[start : end + 1], headers=headers)
+
+    app = web.Application()
+    app.router.add_route("*", "/{name}", handle)
+    test_server = TestServer(app)
+    await test_server.start_server()
+    test_server.methods = methods
+    test_server.files = files
+    test_server.extra_headers = extra_headers
+    test_server.compressed = compressed
+    test_server.accept_encodings = accept_encodings
+    test_server.slow = slow
+    test_server.range_modes = range_modes
+    yield test_server
+    await test_server.close()
@@ -0,0 +1,38 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Optional
+
+from aiohttp.test_utils import TestServer
+
+from alter.core.downloader import DownloadManager, DownloadTask, TaskConfig
+from alter.core.models import DownloadRequest
+
+# Served by the test server for any name without an explicit body
+PAYLOAD = bytes(range(256)) * 64
+
+
+async def download_all(
+    tmp_path: Path, config: Optional[TaskConfig], requests: list[DownloadRequest]
+) -> list[DownloadTask]:
+    """Run the requests together on a fresh manager and return their finished tasks."""
+    manager = DownloadManager(temp_root=tmp_path / "temp", config=config)
+    tasks = [manager.add(request) for request in requests]
+    for task in tasks:
+        manager.start(task.id)
+    await asyncio.gather(*(task.wait() for task in tasks))
+    await manager.close()
+    return tasks
+
+
+async def download(
+    server: TestServer,
+    tmp_path: Path,
+    name: str,
+    config: Optional[TaskConfig] = None,
+    **request: Any,
+) -> DownloadTask:
+    """Download /<name> from the test server, to tmp_path/<name> unless an output is given."""
+    request.setdefault("output", tmp_path / name)
+    url = str(server.make_url(f"/{name}"))
+    [task] = await download_all(tmp_path, config, [DownloadRequest(url=url, **request)])
+    return task
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from alter.core.cache import ContentCache, cache_validator
+
+
+def test_cache_validator_prefers_etag() -> None:
+    assert cache_validator({"ETag": '"abc"', "Content-Length": "3"}) == 'etag:"abc"'
+    assert cache_validator({"Last-Modified": "yesterday", "Content-Length": "3"}) is not None
+    assert cache_validator({"Content-Length": "3"}) is None
+
+
+async def test_cache_evicts_least_recently_used(tmp_path: Path) -> None:
+    cache = ContentCache(tmp_path / "cache", max_bytes=10)
+    for name in ("a", "b", "c"):
+        (tmp_path / name).write_bytes(name.encode() * 4)
+
+    await cache.store("http://x/a", "etag:a", tmp_path / "a")
+    await cache.store("http://x/b", "etag:b", tmp_path / "b")
+    assert cache.lookup("http://x/a", "etag:a") is not None
+    await cache.store("http://x/c", "etag:c", tmp_path / "c")
+
+    assert cache.size == 8
+    assert cache.lookup("http://x/b", "etag:b") is None
+    assert cache.lookup("http://x/a", "etag:a") is not None
+    assert cache.lookup("http://x/a", "etag:other") is None
+
+    cache.flush()
+    reloaded = ContentCache(tmp_path / "cache", max_bytes=10)
+    assert reloaded.lookup("http://x/c", "etag:c") is not None
+
+
+async def test_corrupted_blob_is_not_served(tmp_path: Path) -> None:
+    cache = ContentCache(tmp_path / "cache")
+    (tmp_path / "a").write_bytes(b"payload")
+    await cache.store("http://x/a", "etag:a", tmp_path / "a")
+    blob = cache.lookup("http://x/a", "etag:a")
+    assert blob is not None
+    assert await cache.materialize(blob, tmp_path / "copy")
+    assert (tmp_path / "copy").read_bytes() == b"payload"
+
+    blob.chmod(0o644)
+    blob.write_bytes(b"garbage")
+    assert not await cache.materialize(blob, tmp_path / "copy")
+    assert not blob.exists()
+    assert cache.lookup("http://x/a", "etag:a") is None
@@ -0,0 +1,33 @@
+import pytest
+
+from alter.cli import main
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["http://example.invalid/a.bin", "-o", "-", "--range", "0-9"],
+        ["http://example.invalid/a.tar", "-o", "-", "-x", "out"],
+    ],
+)
+def test_pipe_mode_rejects_file_options(argv: list[str], capsys: pytest.CaptureFixture) -> None:
+    with pytest.raises(SystemExit) as excinfo:
+        main(argv)
+    assert excinfo.value.code == 2
+    assert "cannot be combined" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize(
+    ("argv", "message"),
+    [
+        (["http://example.invalid/a.bin", "--range", "ten-20"], "--range"),
+        (["http://example.invalid/a.tar", "--range", "0-9", "-x", "out"], "cannot be combined"),
+    ],
+)
+def test_invalid_ranges_fail_at_parse_time(
+    argv: list[str], message: str, capsys: pytest.CaptureFixture
+) -> None:
+    with pytest.raises(SystemExit) as excinfo:
+        main(argv)
+    assert excinfo.value.code == 2
+    assert message in capsys.readouterr().err
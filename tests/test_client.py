@@ -0,0 +1,56 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+import alter
+from helpers import PAYLOAD
+
+
+def test_import_has_no_ui_dependencies() -> None:
+    code = "import sys, alter; assert 'textual' not in sys.modules, 'textual imported'"
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_unknown_config_option_is_rejected() -> None:
+    with pytest.raises(TypeError, match="partz"):
+        alter.Client(partz=4)
+
+
+async def test_download_many_yields_results(server: TestServer, tmp_path: Path) -> None:
+    urls = [str(server.make_url(f"/{i}.bin")) for i in range(6)]
+    async with alter.Client(directory=tmp_path, parts=2, temp_root=tmp_path / "temp") as client:
+        results = [result async for result in client.download_many(urls, concurrency=2)]
+        assert client.manager.list() == []
+
+    assert sorted(result.url for result in results) == sorted(urls)
+    assert all(result.ok for result in results)
+    assert all(result.output.read_bytes() == PAYLOAD for result in results)
+
+
+async def test_submit_returns_awaitable_future(server: TestServer, tmp_path: Path) -> None:
+    async with alter.Client(temp_root=tmp_path / "temp") as client:
+        future = client.submit(
+            alter.DownloadRequest(url=str(server.make_url("/x.bin")), output=tmp_path / "x.bin")
+        )
+        result = await future
+
+    assert result.ok
+    assert result.downloaded == len(PAYLOAD)
+
+
+async def test_stream_yields_bytes_in_order(server: TestServer, tmp_path: Path) -> None:
+    body = bytes(range(256)) * 1000
+    server.files["big.bin"] = body
+    async with alter.Client(max_connections=4, chunk_size=1000) as client:
+        chunks = [
+            chunk
+            async for chunk in client.stream(
+                str(server.make_url("/big.bin")), segment_size=10_000, buffer_bytes=40_000
+            )
+        ]
+
+    assert b"".join(chunks) == body
+    assert server.methods.count("GET") == len(range(0, len(body), 10_000))
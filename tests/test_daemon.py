@@ -0,0 +1,104 @@
+import asyncio
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from alter.core.daemon import DownloadDaemon
+from alter.core.downloader import TaskConfig
+from alter.core.models import DownloadProgress, DownloadRequest
+from alter.core.remote import RemoteManager
+from alter.core.rpc import (
+    INVALID_PARAMS,
+    TASK_NOT_FOUND,
+    RPCError,
+    decode_message,
+    make_request,
+)
+
+
+def test_rpc_message_roundtrip() -> None:
+    message = decode_message(make_request("pause", {"task_id": "abc"}, 7))
+    assert message == {"jsonrpc": "2.0", "method": "pause", "params": {"task_id": "abc"}, "id": 7}
+
+
+async def test_remote_manager_shares_daemon_tasks(tmp_path: Path) -> None:
+    daemon = DownloadDaemon(socket_path=tmp_path / "alter.sock", temp_root=tmp_path / "temp")
+    await daemon.start()
+    updates: list[DownloadProgress] = []
+    try:
+        async with RemoteManager(daemon.socket_path, progress_callback=updates.append) as client:
+            task = client.add(DownloadRequest(url="http://example.invalid/file.zip"))
+            assert task.output == Path.cwd() / "file.zip"
+
+            snapshots = await client.call("list")
+            assert [snapshot["task_id"] for snapshot in snapshots] == [task.id]
+            assert daemon.manager.get(task.id).status == "queued"
+
+            with pytest.raises(RPCError) as excinfo:
+                await client.call("pause", task_id="missing")
+            assert excinfo.value.code == TASK_NOT_FOUND
+
+            async with RemoteManager(daemon.socket_path) as other:
+                assert [remote.id for remote in other.list()] == [task.id]
+                other.stop(task.id)
+                await other.call("list")
+
+            await client.call("list")
+            assert task.status == "stopped"
+            assert updates[-1].status == "stopped"
+
+            async with RemoteManager(daemon.socket_path) as other:
+                other.remove(task.id)
+                await other.call("list")
+            client.pause(task.id)
+            await client.call("list")
+            assert task.status == "error"
+            assert updates[-1].error == f"Unknown task: {task.id}"
+    finally:
+        await daemon.close()
+    assert not daemon.socket_path.exists()
+
+
+@pytest.mark.parametrize(
+    "params",
+    [
+        {"url": "http://example.invalid/a.zip", "output": 5},
+        {"url": "http://example.invalid/a.zip", "byte_ranges": "0-9"},
+        {"url": "http://example.invalid/a.zip", "byte_ranges": ["9-0"]},
+        {"url": "http://example.invalid/a.zip", "task_id": "../../evil"},
+        {"url": "http://example.invalid/a.zip", "task_id": 7},
+    ],
+)
+async def test_daemon_rejects_malformed_params(tmp_path: Path, params: dict) -> None:
+    daemon = DownloadDaemon(socket_path=tmp_path / "alter.sock", temp_root=tmp_path / "temp")
+    await daemon.start()
+    try:
+        async with RemoteManager(daemon.socket_path) as client:
+            with pytest.raises(RPCError) as excinfo:
+                await client.call("add", start=False, **params)
+            assert excinfo.value.code == INVALID_PARAMS
+            # The connection survives a bad request
+            assert await client.call("list") == []
+    finally:
+        await daemon.close()
+
+
+async def test_close_waits_for_downloads_to_clean_up(server: TestServer, tmp_path: Path) -> None:
+    server.slow.add("big.bin")
+    daemon = DownloadDaemon(
+        socket_path=tmp_path / "alter.sock", config=TaskConfig(parts=1), temp_root=tmp_path / "temp"
+    )
+    await daemon.start()
+    output_dir = tmp_path / "out"
+    task = daemon.manager.add(
+        DownloadRequest(url=str(server.make_url("/big.bin")), output=output_dir / "big.bin")
+    )
+    daemon.manager.start(task.id)
+    while task.downloaded == 0:
+        await asyncio.sleep(0.01)
+
+    await daemon.close()
+
+    assert task.status == "stopped"
+    assert list(output_dir.iterdir()) == []
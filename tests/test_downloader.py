@@ -0,0 +1,305 @@
+import asyncio
+import gzip
+import io
+import os
+import stat
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+from alter.core.downloader import DownloadManager, TaskConfig, _staging_path
+from alter.core.models import DownloadRequest
+from helpers import PAYLOAD, download, download_all
+
+
+def _requests(server: TestServer, tmp_path: Path, names: list[str]) -> list[DownloadRequest]:
+    return [
+        DownloadRequest(url=str(server.make_url(f"/{name}")), output=tmp_path / name)
+        for name in names
+    ]
+
+
+async def test_small_file_fast_path_skips_probe(server: TestServer, tmp_path: Path) -> None:
+    config = TaskConfig(small_file_threshold=len(PAYLOAD))
+    task = await download(server, tmp_path, "a.bin", config)
+
+    assert task.status == "completed"
+    assert (tmp_path / "a.bin").read_bytes() == PAYLOAD
+    assert server.methods == ["GET"]
+    assert not (tmp_path / "temp").exists()
+
+
+async def test_large_file_falls_back_to_multipart(server: TestServer, tmp_path: Path) -> None:
+    config = TaskConfig(small_file_threshold=1024, parts=4)
+    task = await download(server, tmp_path, "b.bin", config)
+
+    assert task.status == "completed"
+    assert (tmp_path / "b.bin").read_bytes() == PAYLOAD
+    assert "HEAD" not in server.methods
+
+
+async def test_max_active_tasks_queues_extra_tasks(server: TestServer, tmp_path: Path) -> None:
+    manager = DownloadManager(temp_root=tmp_path / "temp", config=TaskConfig(max_active_tasks=2))
+    requests = _requests(server, tmp_path, [f"{i}.bin" for i in range(5)])
+    tasks = [manager.add(request) for request in requests]
+    for task in tasks:
+        manager.start(task.id)
+    await asyncio.sleep(0)
+    assert [task.status for task in tasks].count("queued") == 3
+    await asyncio.gather(*(task.wait() for task in tasks))
+    await manager.close()
+
+    assert all(task.status == "completed" for task in tasks)
+
+
+async def test_queued_fast_path_tasks_are_not_probed(server: TestServer, tmp_path: Path) -> None:
+    config = TaskConfig(small_file_threshold=len(PAYLOAD), max_active_tasks=1)
+    requests = _requests(server, tmp_path, [f"{i}.bin" for i in range(3)])
+    tasks = await download_all(tmp_path, config, requests)
+
+    assert all(task.status == "completed" for task in tasks)
+    # Every task takes the small-file fast path: queued ones only have DNS warmed, never a HEAD
+    assert server.methods == ["GET"] * 3
+
+
+async def test_queued_tasks_are_probed_ahead(server: TestServer, tmp_path: Path) -> None:
+    config = TaskConfig(max_active_tasks=1, parts=1)
+    requests = _requests(server, tmp_path, [f"{i}.bin" for i in range(3)])
+    tasks = await download_all(tmp_path, config, requests)
+
+    assert all(task.status == "completed" for task in tasks)
+    # Queued tasks were probed while waiting and go straight to their data request once launched
+    assert server.methods.count("HEAD") == 3
+    assert server.methods.count("GET") == 3
+
+
+def _tar_gz(members: dict[str, bytes]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w:gz") as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    return buffer.getvalue()
+
+
+@pytest.mark.parametrize("parts", [1, 4])
+async def test_extract_while_downloading(server: TestServer, tmp_path: Path, parts: int) -> None:
+    members = {"data/a.bin": PAYLOAD, "b.txt": b"hello"}
+    server.files["bundle.tar.gz"] = _tar_gz(members)
+    config = TaskConfig(parts=parts, chunk_size=512)
+    task = await download(server, tmp_path, "bundle.tar.gz", config, extract_to=tmp_path / "out")
+
+    assert task.status == "completed", task.error
+    assert not (tmp_path / "bundle.tar.gz").exists()
+    for name, data in members.items():
+        assert (tmp_path / "out" / name).read_bytes() == data
+
+
+async def test_extractions_do_not_hold_executor_workers(server: TestServer, tmp_path: Path) -> None:
+    # More concurrent extractions than default-executor workers, which part writes also need
+    executor = ThreadPoolExecutor(max_workers=2)
+    asyncio.get_running_loop().set_default_executor(executor)
+    server.files["bundle.tar.gz"] = _tar_gz({"a.bin": PAYLOAD})
+    requests = [
+        DownloadRequest(
+            url=str(server.make_url("/bundle.tar.gz")),
+            output=tmp_path / f"{i}.tar.gz",
+            extract_to=tmp_path / f"out{i}",
+        )
+        for i in range(4)
+    ]
+    config = TaskConfig(parts=4, chunk_size=512)
+    tasks = await asyncio.wait_for(download_all(tmp_path, config, requests), timeout=10)
+    executor.shutdown()
+
+    assert [task.status for task in tasks] == ["completed"] * 4
+    for i in range(4):
+        assert (tmp_path / f"out{i}" / "a.bin").read_bytes() == PAYLOAD
+
+
+async def test_cache_serves_repeat_download(server: TestServer, tmp_path: Path) -> None:
+    server.extra_headers["c.bin"] = {"ETag": '"v1"'}
+    config = TaskConfig(cache_dir=tmp_path / "cache")
+    await download(server, tmp_path, "c.bin", config, output=tmp_path / "first.bin")
+    server.methods.clear()
+
+    second = await download(server, tmp_path, "c.bin", config, output=tmp_path / "second.bin")
+
+    assert second.status == "completed", second.error
+    assert (tmp_path / "second.bin").read_bytes() == PAYLOAD
+    assert server.methods == ["HEAD"]
+    # Outputs are independent, writable files; editing one leaves the cached blob intact
+    for name in ("first.bin", "second.bin"):
+        assert (tmp_path / name).stat().st_nlink == 1
+        (tmp_path / name).write_bytes(b"edited")
+    blobs = [path for path in (tmp_path / "cache" / "objects").rglob("*") if path.is_file()]
+    assert [blob.read_bytes() for blob in blobs] == [PAYLOAD]
+
+
+async def test_concurrent_duplicates_share_one_transfer(server: TestServer, tmp_path: Path) -> None:
+    url = str(server.make_url("/d.bin"))
+    requests = [DownloadRequest(url=url, output=tmp_path / f"d{i}.bin") for i in range(3)]
+    tasks = await download_all(tmp_path, TaskConfig(parts=1), requests)
+
+    assert all(task.status == "completed" for task in tasks)
+    assert all((tmp_path / f"d{i}.bin").read_bytes() == PAYLOAD for i in range(3))
+    assert server.methods.count("GET") == 1
+
+
+async def test_duplicate_checks_its_own_digest(server: TestServer, tmp_path: Path) -> None:
+    url = str(server.make_url("/d.bin"))
+    requests = [
+        DownloadRequest(url=url, output=tmp_path / "plain.bin"),
+        DownloadRequest(url=url, output=tmp_path / "checked.bin", sha256="0" * 64),
+    ]
+    plain, checked = await download_all(tmp_path, TaskConfig(parts=1), requests)
+
+    assert plain.status == "completed"
+    assert checked.status == "error"
+    assert "SHA-256 mismatch" in (checked.error or "")
+    assert not (tmp_path / "checked.bin").exists()
+    assert server.methods.count("GET") == 1
+
+
+async def test_stopped_duplicate_sends_no_requests(server: TestServer, tmp_path: Path) -> None:
+    server.slow.add("d.bin")
+    manager = DownloadManager(temp_root=tmp_path / "temp", config=TaskConfig(parts=1))
+    url = str(server.make_url("/d.bin"))
+    primary = manager.add(DownloadRequest(url=url, output=tmp_path / "primary.bin"))
+    follower = manager.add(DownloadRequest(url=url, output=tmp_path / "follower.bin"))
+    for task in (primary, follower):
+        manager.start(task.id)
+    follower.stop()
+    await asyncio.gather(primary.wait(), follower.wait())
+    await manager.close()
+
+    assert [primary.status, follower.status] == ["completed", "stopped"]
+    assert server.methods == ["HEAD", "GET"]
+
+
+async def test_sha256_mismatch_fails_task(server: TestServer, tmp_path: Path) -> None:
+    task = await download(server, tmp_path, "e.bin", sha256="0" * 64)
+
+    assert task.status == "error"
+    assert "SHA-256 mismatch" in (task.error or "")
+    assert not (tmp_path / "e.bin").exists()
+
+
+async def test_negotiated_encoding_reports_wire_and_decoded_bytes(
+    server: TestServer, tmp_path: Path
+) -> None:
+    text = b"timestamp,level,message\n" + b"2024-01-01,INFO,request served\n" * 4000
+    server.files["log.csv"] = text
+    server.compressed.add("log.csv")
+    task = await download(server, tmp_path, "log.csv", TaskConfig(negotiate_encoding=True))
+
+    assert task.status == "completed"
+    assert (tmp_path / "log.csv").read_bytes() == text
+    progress = task.progress()
+    assert progress.downloaded == progress.total == len(text)
+    assert progress.wire_total == progress.wire_downloaded == len(gzip.compress(text))
+    assert progress.wire_total < len(text) // 5
+    assert "gzip" in server.accept_encodings[-1]
+
+
+async def test_unnegotiated_download_asks_for_identity(server: TestServer, tmp_path: Path) -> None:
+    server.compressed.add("g.bin")
+    task = await download(server, tmp_path, "g.bin", TaskConfig(parts=4))
+
+    assert task.status == "completed", task.error
+    assert (tmp_path / "g.bin").read_bytes() == PAYLOAD
+    assert task.total == len(PAYLOAD)
+    assert server.methods.count("GET") == 4
+    assert set(server.accept_encodings) == {"identity"}
+
+
+async def test_failed_download_keeps_previous_output(server: TestServer, tmp_path: Path) -> None:
+    (tmp_path / "f.bin").write_bytes(b"previous version")
+    task = await download(server, tmp_path, "f.bin", sha256="0" * 64)
+
+    assert task.status == "error"
+    assert (tmp_path / "f.bin").read_bytes() == b"previous version"
+    assert not [path for path in tmp_path.iterdir() if path.name.startswith(".")]
+
+
+@pytest.mark.parametrize(
+    ("durability", "parts"), [("fast", 1), ("safe", 4), ("strict", 1), ("strict", 4)]
+)
+async def test_durability_levels_sync_before_rename(
+    server: TestServer, tmp_path: Path, monkeypatch: pytest.MonkeyPatch, durability: str, parts: int
+) -> None:
+    synced: list[bool] = []
+    real_fsync = os.fsync
+
+    def recording_fsync(fd: int) -> None:
+        # Record whether each fsync targets a directory, then really sync
+        synced.append(stat.S_ISDIR(os.fstat(fd).st_mode))
+        real_fsync(fd)
+
+    monkeypatch.setattr(os, "fsync", recording_fsync)
+    config = TaskConfig(parts=parts, durability=durability)
+    task = await download(server, tmp_path, "g.bin", config, output=tmp_path / "out" / "g.bin")
+
+    assert task.status == "completed"
+    assert (tmp_path / "out" / "g.bin").read_bytes() == PAYLOAD
+    assert [path.name for path in (tmp_path / "out").iterdir()] == ["g.bin"]
+    # The file is synced exactly once before the rename, then (strict) its directory
+    expected = {"fast": [], "safe": [False], "strict": [False, True]}
+    assert synced == expected[durability]
+
+
+@pytest.mark.parametrize("task_id", ["../../evil", "a/b", "", "0123456789abcdef" * 2])
+def test_staging_path_stays_next_to_output(tmp_path: Path, task_id: str) -> None:
+    staging = _staging_path(tmp_path / "g.bin", task_id)
+    assert staging.parent == tmp_path
+    assert staging.name.startswith(".g.bin.") and staging.name.endswith(".part")
+
+
+def test_unknown_durability_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        TaskConfig(durability="paranoid")
+
+
+async def test_runtime_state_exists_only_while_active(server: TestServer, tmp_path: Path) -> None:
+    manager = DownloadManager(temp_root=tmp_path / "temp", config=TaskConfig(max_active_tasks=1))
+    requests = _requests(server, tmp_path, [f"r{i}.bin" for i in range(3)])
+    tasks = [manager.add(request) for request in requests]
+    assert not hasattr(tasks[0], "__dict__")
+    assert all(task._runtime is None for task in tasks)
+    for task in tasks[:2]:
+        manager.start(task.id)
+    assert tasks[0]._runtime is not None
+    assert tasks[1]._runtime is None
+
+    tasks[2].stop()
+    await tasks[2].wait()
+    await asyncio.gather(*(task.wait() for task in tasks[:2]))
+    await manager.close()
+
+    assert [task.status for task in tasks] == ["completed", "completed", "stopped"]
+    assert all(task._runtime is None and task._runner is None for task in tasks)
+    # Terminal tasks answer wait() without allocating anything
+    await tasks[0].wait()
+    assert tasks[0]._done is None
+
+
+async def test_dropped_queued_tasks_release_waiters(server: TestServer, tmp_path: Path) -> None:
+    manager = DownloadManager(temp_root=tmp_path / "temp", config=TaskConfig(max_active_tasks=1))
+    requests = _requests(server, tmp_path, [f"d{i}.bin" for i in range(3)])
+    tasks = [manager.add(request) for request in requests]
+    for task in tasks:
+        manager.start(task.id)
+    waiters = [asyncio.ensure_future(task.wait()) for task in tasks]
+
+    manager.remove(tasks[1].id)
+    await asyncio.wait_for(waiters[1], timeout=5)
+    assert tasks[1].status == "stopped"
+
+    await manager.close()
+    await asyncio.wait_for(asyncio.gather(*waiters), timeout=5)
+    assert tasks[2].status == "stopped"
+    assert not (tmp_path / "d1.bin").exists()
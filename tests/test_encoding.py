@@ -0,0 +1,73 @@
+import gzip
+import os
+import zlib
+
+import pytest
+
+from alter.core.encoding import ContentDecoder, accept_encoding, content_codings
+
+
+DATA = b"alter " * 10000
+
+
+def _feed(decoder: ContentDecoder, body: bytes, size: int = 777) -> bytes:
+    output = b"".join(decoder.decompress(body[i : i + size]) for i in range(0, len(body), size))
+    return output + decoder.flush()
+
+
+def test_content_codings_ignores_identity() -> None:
+    assert content_codings("identity") == []
+    assert content_codings("deflate, GZIP") == ["deflate", "gzip"]
+    assert "gzip" in accept_encoding()
+
+
+def test_decodes_multi_member_gzip() -> None:
+    body = gzip.compress(DATA[:30000]) + gzip.compress(DATA[30000:])
+    assert _feed(ContentDecoder("gzip"), body) == DATA
+
+
+@pytest.mark.parametrize("wbits", [zlib.MAX_WBITS, -zlib.MAX_WBITS])
+def test_decodes_wrapped_and_raw_deflate(wbits: int) -> None:
+    compressor = zlib.compressobj(wbits=wbits)
+    body = compressor.compress(DATA) + compressor.flush()
+    assert _feed(ContentDecoder("deflate"), body) == DATA
+
+
+def test_undoes_chained_codings_in_reverse() -> None:
+    compressor = zlib.compressobj()
+    body = gzip.compress(compressor.compress(DATA) + compressor.flush())
+    assert _feed(ContentDecoder("deflate, gzip"), body) == DATA
+
+
+def test_truncated_stream_is_an_error() -> None:
+    body = gzip.compress(DATA)
+    decoder = ContentDecoder("gzip")
+    decoder.decompress(body[: len(body) // 2])
+    with pytest.raises(ValueError):
+        decoder.flush()
+
+
+def test_decodes_concatenated_zstd_frames() -> None:
+    zstandard = pytest.importorskip("zstandard")
+    compressor = zstandard.ZstdCompressor()
+    body = compressor.compress(DATA[:30000]) + compressor.compress(DATA[30000:])
+    assert _feed(ContentDecoder("zstd"), body, size=5) == DATA
+
+
+@pytest.mark.parametrize("coding", ["br", "zstd"])
+def test_truncated_br_and_zstd_are_errors(coding: str) -> None:
+    data = os.urandom(50000)
+    if coding == "br":
+        body = pytest.importorskip("brotli").compress(data)
+    else:
+        body = pytest.importorskip("zstandard").ZstdCompressor().compress(data)
+    assert _feed(ContentDecoder(coding), body) == data
+    decoder = ContentDecoder(coding)
+    decoder.decompress(body[: len(body) // 2])
+    with pytest.raises(ValueError):
+        decoder.flush()
+
+
+def test_unknown_coding_is_rejected() -> None:
+    with pytest.raises(ValueError):
+        ContentDecoder("compress")
@@ -0,0 +1,55 @@
+import io
+import zipfile
+from pathlib import Path
+
+import pytest
+
+from alter.core.extract import StreamExtractor, archive_kind
+
+
+class _Unseekable(io.RawIOBase):
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: bytes) -> int:
+        self.data += data
+        return len(data)
+
+
+def test_archive_kind() -> None:
+    assert archive_kind("backup.tar.gz") == ("tar.gz", "backup")
+    assert archive_kind("logs.TZST") == ("tar.zst", "logs")
+    assert archive_kind("dump.csv.gz") == ("gz", "dump.csv")
+    assert archive_kind("file.bin") is None
+
+
+async def test_streaming_zip_with_data_descriptors(tmp_path: Path) -> None:
+    # Writing to an unseekable stream forces data descriptors, like most on-the-fly zips
+    stream = _Unseekable()
+    with zipfile.ZipFile(stream, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("docs/readme.txt", b"alter " * 1000)
+        archive.writestr("empty/", b"")
+
+    extractor = StreamExtractor(tmp_path / "out", "bundle.zip")
+    data = bytes(stream.data)
+    for offset in range(0, len(data), 97):
+        await extractor.feed(data[offset : offset + 97])
+    await extractor.finish()
+
+    assert (tmp_path / "out" / "docs" / "readme.txt").read_bytes() == b"alter " * 1000
+    assert (tmp_path / "out" / "empty").is_dir()
+
+
+async def test_extractor_rejects_path_traversal(tmp_path: Path) -> None:
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        archive.writestr("../escape.txt", b"nope")
+
+    extractor = StreamExtractor(tmp_path / "out", "evil.zip")
+    with pytest.raises(ValueError):
+        await extractor.feed(buffer.getvalue())
+        await extractor.finish()
+    assert not (tmp_path / "escape.txt").exists()
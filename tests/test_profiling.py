@@ -0,0 +1,35 @@
+import json
+from pathlib import Path
+
+from aiohttp.test_utils import TestServer
+
+from alter.core import profiling
+from alter.core.downloader import TaskConfig
+from helpers import download
+
+
+async def test_profile_breaks_down_stages_per_task(server: TestServer, tmp_path: Path) -> None:
+    profiler = profiling.Profiler(trace=True, lag_interval=0.001)
+    profiling.enable(profiler)
+    try:
+        task = await download(server, tmp_path, "p.bin", TaskConfig(parts=4, chunk_size=1024))
+    finally:
+        assert profiling.disable() is profiler
+
+    assert task.status == "completed"
+    report = profiler.report()
+    assert f"{task.id} (p.bin)" in report
+    for stage in ("network", "write", "progress", "notify", "merge"):
+        assert f"  {stage} " in report
+    assert "Event loop lag:" in report
+
+    trace = tmp_path / "trace.json"
+    profiler.write_trace(trace)
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert {"M", "X"} <= {event["ph"] for event in events}
+    assert any(event["ph"] == "X" and event["name"] == "merge" for event in events)
+
+
+def test_disabled_spans_are_shared_no_ops() -> None:
+    assert profiling.active() is None
+    assert profiling.span("write", "a") is profiling.span("network", "b")
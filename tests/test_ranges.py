@@ -0,0 +1,77 @@
+from pathlib import Path
+
+import pytest
+from aiohttp.test_utils import TestServer
+
+import alter
+from alter.core.downloader import TaskConfig
+from alter.core.ranges import coalesce_ranges, parse_byte_range, resolve_ranges
+from helpers import PAYLOAD, download
+
+
+def test_parse_byte_range() -> None:
+    assert parse_byte_range("0-99") == (0, 99)
+    assert parse_byte_range("bytes=100-") == (100, None)
+    assert parse_byte_range("-65536") == (None, 65536)
+    with pytest.raises(ValueError):
+        parse_byte_range("10-5")
+    with pytest.raises(ValueError, match="Invalid byte range"):
+        parse_byte_range("ten-20")
+
+
+def test_resolve_and_coalesce_ranges() -> None:
+    ranges = resolve_ranges(["-10", "0-9", "15-19", "5-", "500-2000"], total=1000)
+    assert ranges == [(990, 999), (0, 9), (15, 19), (5, 999), (500, 999)]
+    assert coalesce_ranges([(0, 9), (15, 19), (100, 109)], gap=5) == [(0, 19), (100, 109)]
+    assert coalesce_ranges([(100, 109), (0, 9), (5, 50)], gap=0) == [(0, 50), (100, 109)]
+
+
+async def test_fetch_ranges_into_memory(server: TestServer) -> None:
+    async with alter.Client(range_gap=0, max_connections=1) as client:
+        result = await client.fetch_ranges(
+            str(server.make_url("/p.bin")), ["0-9", "1000-1099", "-16"]
+        )
+
+    assert result[(0, 9)] == PAYLOAD[:10]
+    assert result[(1000, 1099)] == PAYLOAD[1000:1100]
+    assert result[(len(PAYLOAD) - 16, len(PAYLOAD) - 1)] == PAYLOAD[-16:]
+    # All three ranges went out in a single multi-range request
+    assert server.methods == ["GET", "GET"]
+
+
+async def test_partial_download_writes_sparse_file(server: TestServer, tmp_path: Path) -> None:
+    config = TaskConfig(range_gap=0)
+    task = await download(server, tmp_path, "p.bin", config, byte_ranges=("100-199", "-50"))
+
+    assert task.status == "completed", task.error
+    data = (tmp_path / "p.bin").read_bytes()
+    assert len(data) == len(PAYLOAD)
+    assert data[100:200] == PAYLOAD[100:200]
+    assert data[-50:] == PAYLOAD[-50:]
+    assert data[:100] == bytes(100)
+
+
+@pytest.mark.parametrize("mode", ["first", "drop-last"])
+async def test_ranges_left_out_of_a_reply_are_refetched(
+    server: TestServer, tmp_path: Path, mode: str
+) -> None:
+    server.range_modes["p.bin"] = mode
+    config = TaskConfig(range_gap=0, max_connections=1)
+    task = await download(server, tmp_path, "p.bin", config, byte_ranges=("0-9", "100-199", "-16"))
+
+    assert task.status == "completed", task.error
+    assert task.downloaded == 10 + 100 + 16
+    data = (tmp_path / "p.bin").read_bytes()
+    assert data[:10] == PAYLOAD[:10]
+    assert data[100:200] == PAYLOAD[100:200]
+    assert data[-16:] == PAYLOAD[-16:]
+
+
+async def test_ranges_that_never_arrive_fail_the_task(server: TestServer, tmp_path: Path) -> None:
+    server.range_modes["p.bin"] = "short"
+    config = TaskConfig(range_gap=0)
+    task = await download(server, tmp_path, "p.bin", config, byte_ranges=("0-9", "-16"))
+
+    assert task.status == "error"
+    assert "did not return bytes" in (task.error or "")
+    assert not (tmp_path / "p.bin").exists()